@@ -8,9 +8,22 @@ Copyright (c) 2013 - 2016 Isaac Muse <isaacmuse@gmail.com>
 from __future__ import unicode_literals
 import sublime
 import sublime_plugin
-import codecs
-import re
-from os.path import exists
+import heapq
+import threading
+from itertools import takewhile
+from os import stat
+from os.path import basename, exists, expanduser, getsize, join
+from .rle.audit import AuditCache, audit, iter_files
+from .rle.cache import EndingCache, file_key
+from .rle.diff import changed_span
+from .rle.endings import EndingMap, LF, CR, CRLF, KIND_NAMES, NEWLINES
+from .rle.convert import convert_file, dense_runs, restore_endings
+from .rle.encoding import candidates, decode_start, resolve
+from .rle.profile import ApiCounter, NullProfiler, Profiler
+from .rle.scan import (
+    StreamScanner, is_ascii_compatible, map_file, row_offsets, scan_bytes, scan_file_endings, scan_text
+)
+from .rle.summary import summarize, summarize_mapped
 try:
     from SubNotify.sub_notify import SubNotifyIsReadyCommand as Notify
 except Exception:
@@ -45,86 +58,639 @@ html.light span {
 </style>
 """
 
-RE_NEW_LINE = re.compile(r'(?:\r\n|(?!\r\n)[\n\r])')
 
+GLYPHS = {
+    LF: '<span>¬</span>',
+    CR: '<span>¤</span>',
+    CRLF: '<span>¤</span><span>¬</span>'
+}
+
+STYLES = {
+    "Unix": LF,
+    "Windows": CRLF,
+    "MacOS": CR
+}
+
+REGION_KEYS = tuple('rle_%s' % name for name in KIND_NAMES)
+
+LINE_ENDINGS = {
+    LF: "Unix",
+    CRLF: "Windows",
+    CR: "CR"
+}
+
+LINE_ENDING_KINDS = {name: kind for kind, name in LINE_ENDINGS.items()}
+
+# State of views keyed by view id.
+VIEWS = {}
+
+# Views with line endings being processed in the background.
+BUSY = set()
+
+# Cached statistics of audited files.
+AUDIT_CACHE = AuditCache()
+
+# Version of the file shown in each window's popup panel keyed by window id.
+POPUPS = {}
+
+# Windows with a line ending audit running.
+AUDITING = set()
+
+# Navigable results: `path:row: summary`.
+AUDIT_RESULT_REGEX = r'^(.+?):(\d+): '
+
+# How often (ms) a view waiting for an unsaved buffer is checked in case its load event is missed.
+LOAD_POLL = 1000
+
+# How often (ms) the viewport of a raw line view is checked for scrolling.
+VIEWPORT_POLL = 100
+
+# Counts the API calls made by profiled operations.
+API_CALLS = ApiCounter((('view', sublime.View), ('window', sublime.Window), ('phantom_set', sublime.PhantomSet)))
+
+NULL_PROFILER = NullProfiler()
+
+
+def viewport_phantoms():
+    """Only render phantoms around the visible region."""
+
+    return bool(sublime.load_settings("raw_line_edit.sublime-settings").get("viewport_phantoms", True))
+
+
+def viewport_margin():
+    """Number of rows to render above and below the visible region."""
+
+    return int(sublime.load_settings("raw_line_edit.sublime-settings").get("viewport_margin", 200))
+
+
+def update_ending_regions(view, endings):
+    """
+    Store the ending map in the view as regions.
+
+    Every ending kind gets a single region key holding one region per run.
+    A run's region spans from its first to its last line ending.
+    """
+
+    point = row_points(view)
+    regions = ([], [], [])
+    for start, count, kind in endings.runs():
+        regions[kind].append(sublime.Region(point(start + 1) - 1, point(start + count)))
+    for kind, key in enumerate(REGION_KEYS):
+        view.add_regions(key, regions[kind], '', '', sublime.HIDDEN)
+
+
+def erase_ending_regions(view):
+    """Erase the ending regions."""
+
+    for key in REGION_KEYS:
+        view.erase_regions(key)
+
+
+class ViewState(object):
+    """
+    State of a view.
+
+    `endings` is the ending map of a raw line view.
+    `offsets` are the `row_offsets` of its text, if known, so rows are placed without calling `text_point`.
+    `renderer` renders its phantoms, and `save_spans` are the spans rewritten while it is saved.
+    `text` and `region` are the text waiting to be written by `raw_lines_edit_replace`, and
+    `buffer` is an unsaved buffer waiting for the view to load.
+    """
+
+    __slots__ = ('endings', 'offsets', 'renderer', 'save_spans', 'text', 'region', 'buffer')
+
+    def __init__(self):
+        """Initialize."""
 
-def process_lines(text):
-    """Count line ending types and return buffer with only new lines."""
+        self.endings = None
+        self.offsets = None
+        self.renderer = None
+        self.save_spans = None
+        self.text = None
+        self.region = None
+        self.buffer = None
 
-    crlf = []
-    lf = []
-    cr = []
-    line = {'value': -1}
 
-    def repl(m):
-        """Replace."""
+def get_view_state(view):
+    """Get the state of a view, creating it if needed."""
 
-        line['value'] += 1
-        end = m.group(0)
-        if end == '\r\n':
-            crlf.append(line['value'])
-        elif end == '\n':
-            lf.append(line['value'])
+    state = VIEWS.get(view.id())
+    if state is None:
+        state = ViewState()
+        VIEWS[view.id()] = state
+    return state
+
+
+def get_renderer(view):
+    """Get the phantom renderer of a raw line view."""
+
+    state = get_view_state(view)
+    if state.renderer is None:
+        state.renderer = PhantomRenderer(view)
+    return state.renderer
+
+
+def resume_rendering(view):
+    """Follow the viewport of a raw line view again once it is back on screen."""
+
+    state = VIEWS.get(view.id())
+    if state is not None and state.renderer is not None and viewport_phantoms():
+        state.renderer.watch()
+
+
+def discard_view(view):
+    """Release everything tracked for a view."""
+
+    VIEWS.pop(view.id(), None)
+
+
+def row_points(view):
+    """
+    Get a function giving the point where a row of a raw line view starts.
+
+    Points are looked up in the view's row offsets if known, otherwise they come from `text_point`.
+    """
+
+    offsets = get_view_state(view).offsets
+    if offsets is None:
+        return lambda row: view.text_point(row, 0)
+    return lambda row: offsets[row - 1] if row else 0
+
+
+def update_phantoms(view, endings, offsets=None):
+    """Store the ending map, and the row offsets of the text if known, for the view and update phantoms."""
+
+    state = get_view_state(view)
+    state.endings = endings
+    state.offsets = offsets
+    update_ending_regions(view, endings)
+    get_renderer(view).render()
+
+
+def replace_text(view, region, text):
+    """Replace a region of the view with text, or a list of text chunks, through `raw_lines_edit_replace`."""
+
+    state = get_view_state(view)
+    state.region = region
+    state.text = text
+    view.run_command("raw_lines_edit_replace")
+
+
+def get_ending_map(view, text=None):
+    """
+    Get the ending map of a raw line view.
+
+    The map is lost if the plugin is reloaded, in which case it is rebuilt
+    by merging the ending regions stored in the view.
+    """
+
+    state = get_view_state(view)
+    if state.endings is None:
+        if text is None:
+            text = view.substr(sublime.Region(0, view.size()))
+        runs = heapq.merge(
+            *[[(r.begin(), r.end(), kind) for r in view.get_regions(key)] for kind, key in enumerate(REGION_KEYS)]
+        )
+        state.endings = EndingMap((kind, text.count('\n', begin, end)) for begin, end, kind in runs)
+    return state.endings
+
+
+class PhantomRenderer(object):
+    """
+    Render line ending phantoms of a raw line view.
+
+    When `viewport_phantoms` is enabled, only the visible rows plus a margin get phantoms.
+    The viewport is polled while the view is on screen and phantoms are re-rendered once scrolling settles.
+    Polling stops when the view is hidden and resumes when it is activated again.
+    """
+
+    def __init__(self, view):
+        """Initialize."""
+
+        self.view = view
+        self.phantoms = sublime.PhantomSet(view, 'rle_phantoms')
+        self.rows = (0, 0)
+        self.margin = 0
+        self.visible = None
+        self.polling = False
+
+    def visible_rows(self):
+        """Get the first and last (exclusive) visible rows."""
+
+        visible = self.view.visible_region()
+        return self.view.rowcol(visible.begin())[0], self.view.rowcol(visible.end())[0] + 1
+
+    def render(self):
+        """Render the phantoms of the rows in the rendering window."""
+
+        endings = get_ending_map(self.view)
+        if viewport_phantoms():
+            self.margin = viewport_margin()
+            first, last = self.visible_rows()
+            start, end = max(first - self.margin, 0), last + self.margin
+            self.watch()
         else:
-            cr.append((line['value']))
-        return '\n'
+            start, end = 0, len(endings)
+        self.rows = (start, end)
+
+        point = row_points(self.view)
+        self.phantoms.update(
+            [
+                sublime.Phantom(
+                    sublime.Region(point(row + 1) - 1),
+                    '%s%s' % (CSS, GLYPHS[kind]),
+                    sublime.LAYOUT_INLINE
+                ) for row, kind in endings.iter_rows(start, end)
+            ]
+        )
 
-    text = RE_NEW_LINE.sub(repl, text)
-    return text, lf, cr, crlf
+    def clear(self):
+        """Remove all phantoms."""
+
+        self.rows = (0, 0)
+        self.phantoms.update([])
+
+    def shown(self):
+        """Check if the view is on screen: the focused view of its group, or the shown output panel."""
+
+        window = self.view.window()
+        if window is None:
+            return False
+        group = window.get_view_index(self.view)[0]
+        if group == -1:
+            # Output panels aren't in a group.
+            return window.active_panel() == "output.raw_line_edit_view"
+        active = window.active_view_in_group(group)
+        return active is not None and active.id() == self.view.id()
+
+    def watch(self):
+        """Start following the viewport."""
+
+        if not self.polling:
+            self.polling = True
+            sublime.set_timeout(self.poll, VIEWPORT_POLL)
+
+    def poll(self):
+        """Re-render when the viewport has settled close to the edge of the rendered rows."""
+
+        state = VIEWS.get(self.view.id())
+        if state is None or state.renderer is not self or not self.view.is_valid() or not self.shown():
+            self.polling = False
+            return
+
+        visible = self.view.visible_region()
+        if visible == self.visible and self.rows != (0, 0):
+            first, last = self.visible_rows()
+            start, end = self.rows
+            slack = self.margin // 2
+            if (start > 0 and first - slack < start) or last + slack > end:
+                self.render()
+        self.visible = visible
+        sublime.set_timeout(self.poll, VIEWPORT_POLL)
 
 
 def strip_buffer_glyphs(view):
     """Strip all glyphs from buffer to load back into view."""
 
-    line = -1
-    more = True
-    last_value = -1
-    lines = []
-    mappings = {'crlf': '\r\n', 'cr': '\r', 'lf': '\n'}
-    while more:
-        line += 1
-        value = view.text_point(line, 0)
-        region = None
-        for line_type in ('crlf', 'cr', 'lf'):
-            regions = view.get_regions('rle_line_%d_%s' % (line, line_type))
-            if regions:
-                view.erase_regions('rle_line_%d_%s' % (line, line_type))
-                region = regions[0]
-                break
-        if region is not None:
-            view.erase_phantoms('rle_line_%d' % line)
-            lines.append(view.substr(view.line(region)) + mappings[line_type])
-        if value == last_value:
-            more = False
-        last_value = value
-    return ''.join(lines)
+    text = view.substr(sublime.Region(0, view.size()))
+    endings = get_ending_map(view, text)
+    get_renderer(view).clear()
+    erase_ending_regions(view)
+    return restore_endings(text, endings)
 
 
-def convert_buffers():
-    """Operate on unsaved buffers."""
+def read_view_buffer(view):
+    """Read the unsaved buffer of a view with its line endings."""
 
-    return bool(sublime.load_settings("raw_line_edit.sublime-settings").get("operate_on_unsaved_buffers", False))
+    text = view.substr(sublime.Region(0, view.size()))
+    ending = LINE_ENDING_KINDS[view.line_endings()]
+    return text if ending == LF else text.replace('\n', NEWLINES[ending])
+
+
+def selected_rows(view):
+    """Return the rows covered by the selections as sorted, merged `(start, end)` ranges."""
+
+    ranges = sorted(
+        (view.rowcol(s.begin())[0], view.rowcol(s.end())[0] + 1) for s in view.sel()
+    )
+    merged = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def replace_chunks(view, edit, region, chunks):
+    """Replace the region with a list of text chunks, releasing each chunk once inserted."""
+
+    view.erase(edit, region)
+    pt = region.begin()
+    chunks.reverse()
+    while chunks:
+        pt += view.insert(edit, pt, chunks.pop())
+
+
+def read_file(file_name, encodings, progress=None, cache=None, profile=NULL_PROFILER, offsets=False, endings=None):
+    """
+    Read a file once and decode it against each candidate encoding in turn.
+
+    Return the normalized text chunks, ending map and, with `offsets`, row offsets
+    (otherwise `None`) of the first encoding that decodes.
+    If the file's ending map is in the cache, or is given as `endings` from a scan of its raw
+    bytes, the file is only decoded, not scanned.
+    """
+
+    err = None
+    known = endings
+    with map_file(file_name) as data:
+        profile.count(bytes=len(data))
+        key = None
+        if cache is not None and known is None:
+            with profile.phase("cache"):
+                key = file_key(file_name, data)
+                hit = cache.get(file_name, key)
+            if hit is not None:
+                codec, endings = hit
+                for encoding in encodings:
+                    if encoding.codec == codec:
+                        scanner = StreamScanner(endings, offsets)
+                        with profile.phase("decode"):
+                            chunks = list(
+                                scanner.scan_buffer(data, codec, decode_start(data, encoding), progress=progress)
+                            )
+                        profile.count(lines=len(endings), runs=len(endings.kinds), cached=True)
+                        return chunks, endings, scanner.offsets
+
+        for encoding in encodings:
+            # A map found in the raw bytes holds for any encoding they can be searched in.
+            scanner = StreamScanner(known if is_ascii_compatible(encoding.codec) else None, offsets)
+            try:
+                with profile.phase("scan"):
+                    chunks = list(
+                        scanner.scan_buffer(data, encoding.codec, decode_start(data, encoding), progress=progress)
+                    )
+            except UnicodeDecodeError as e:
+                err = e
+                continue
+            endings = scanner.endings
+            profile.count(lines=len(endings), runs=len(endings.kinds), cached=False)
+            if cache is not None:
+                with profile.phase("store"):
+                    store_ending_map(cache, file_name, key, encoding.codec, endings)
+            return chunks, endings, scanner.offsets
+    raise err
+
+
+def get_ending_cache():
+    """Get the on disk ending map cache, or `None` if it is disabled."""
+
+    settings = sublime.load_settings("raw_line_edit.sublime-settings")
+    if not settings.get("ending_map_cache", True):
+        return None
+    return EndingCache(
+        join(sublime.cache_path(), "RawLineEdit"), int(settings.get("ending_map_cache_size", 16 * 1024 * 1024))
+    )
+
+
+def get_profiler(operation):
+    """Get a profiler for an operation if the `profile` setting is enabled."""
+
+    settings = sublime.load_settings("raw_line_edit.sublime-settings")
+    if not settings.get("profile", False):
+        return NULL_PROFILER
+    log = settings.get("profile_log", "")
+    return Profiler(
+        operation, API_CALLS, expanduser(log) if log else None, bool(settings.get("profile_cprofile", False))
+    )
+
+
+def store_ending_map(cache, file_name, key, codec, endings):
+    """Store an ending map in the cache, computing the file's key if not given (call off the main thread)."""
+
+    try:
+        if key is None:
+            with map_file(file_name) as data:
+                key = file_key(file_name, data)
+        cache.put(file_name, key, codec, endings)
+    except OSError as e:
+        print("RawLineEdit: could not cache line endings of %s: %s" % (file_name, e))
+
+
+class ScanProgress(object):
+    """Report scan progress of a file in the status bar."""
+
+    def __init__(self, file_name):
+        """Initialize."""
+
+        self.name = basename(file_name)
+        self.percent = -1
+
+    def __call__(self, done, total):
+        """Update the status bar when the percentage changes."""
+
+        percent = done * 100 // total if total else 100
+        if percent != self.percent:
+            self.percent = percent
+            sublime.status_message("RawLineEdit: scanning %s (%d%%)" % (self.name, percent))
+
+
+def run_async(view, work, done):
+    """
+    Run `work` off the main thread and hand its result to `done` on the main thread.
+
+    Only one job runs per view at a time, and `done` is skipped if the view was closed meanwhile.
+    """
+
+    view_id = view.id()
+    if view_id in BUSY:
+        notify("Line endings are still being processed.")
+        return
+    BUSY.add(view_id)
+
+    def finish(result, err):
+        """Apply the result on the main thread."""
+
+        BUSY.discard(view_id)
+        if err is not None:
+            error(err)
+        elif view.is_valid():
+            done(result)
 
+    def worker():
+        """Do the work."""
 
-def get_encoding(view):
-    """Get the file encoding."""
+        result = None
+        err = None
+        try:
+            result = work()
+        except Exception as e:
+            err = str(e)
+        sublime.set_timeout(lambda: finish(result, err), 0)
+
+    sublime.set_timeout_async(worker, 0)
+
+
+def status_bar_stats():
+    """Show line ending statistics in the status bar when files are loaded or saved."""
+
+    return bool(sublime.load_settings("raw_line_edit.sublime-settings").get("status_bar_stats", False))
+
+
+def show_stats(view, stats, quiet=False):
+    """
+    Show the line ending statistics of a view in the status bar.
+
+    The statistics are also stored in the view's `RawLineEditStats` setting for other commands to use.
+    """
+
+    summary = "Line Endings: %s" % stats.summary()
+    view.set_status("raw_line_edit", summary)
+    view.settings().set("RawLineEditStats", stats.to_dict())
+    if not quiet:
+        notify(summary)
 
-    encoding = view.encoding()
-    mapping = [
-        ("with BOM", ""),
-        ("Windows", "cp"),
-        ("-", "_"),
-        (" ", "")
-    ]
-    encoding = view.encoding()
-    m = re.match(r'.+\((.*)\)', encoding)
-    if m is not None:
-        encoding = m.group(1)
 
-    for item in mapping:
-        encoding = encoding.replace(item[0], item[1])
+def update_stats_async(view):
+    """Scan the file of the view from disk and update its line ending statistics (call off the main thread)."""
 
-    return "utf_8" if encoding in ["Undefined", "Hexidecimal"] else encoding
+    file_name = view.file_name()
+    if file_name is None or view.settings().get("RawLineEdit", False) or not exists(file_name):
+        return
+    try:
+        stats = scan_file_endings(file_name, resolve(view.encoding()).codec).stats()
+    except (OSError, UnicodeDecodeError):
+        return
+    sublime.set_timeout(lambda: show_stats(view, stats, True) if view.is_valid() else None, 0)
+
+
+def summary_options():
+    """Return the popup summary mode `(bytes, lines, context)` options; a threshold of 0 disables it."""
+
+    settings = sublime.load_settings("raw_line_edit.sublime-settings")
+    return (
+        int(settings.get("popup_summary_bytes", 10 * 1024 * 1024)),
+        int(settings.get("popup_summary_lines", 100000)),
+        int(settings.get("popup_summary_context", 2))
+    )
+
+
+def profile_scan_text(text, profile, offsets=False):
+    """
+    Scan a buffer's text for `scan_text`, timing it and counting its lines and bytes.
+
+    Returns `(text, endings)`, or with `offsets`, `(text, endings, row offsets)` like `read_file`.
+    """
+
+    with profile.phase("scan"):
+        text, endings = scan_text(text)
+        result = (text, endings, row_offsets(text)) if offsets else (text, endings)
+    profile.count(bytes=len(text), lines=len(endings), runs=len(endings.kinds))
+    return result
+
+
+def summarize_popup(result, size, options, profile=NULL_PROFILER):
+    """
+    Reduce a scanned popup result to a summary of its line ending anomalies if it is over a threshold.
+
+    Returns `(text, endings, stats)` where `stats` is `None` if the full text is kept.
+    """
+
+    text, endings = result[:2]
+    max_bytes, max_lines, context = options
+    if not ((max_bytes and size > max_bytes) or (max_lines and len(endings) + 1 > max_lines)):
+        return text, endings, None
+    with profile.phase("summarize"):
+        stats = endings.stats()
+        if isinstance(text, list):
+            # Files are read as a list of chunks.
+            text = ''.join(text)
+        text, endings, _ = summarize(text, endings, context)
+    return text, endings, stats
+
+
+def summarize_file(file_name, encodings, options, cache=None, profile=NULL_PROFILER):
+    """
+    Summarize a file that is over a popup threshold straight from its memory mapped bytes.
+
+    The ending map is found without decoding the file, and only the summary rows are decoded.
+    Returns `(summary, endings)`.  `summary` is `(text, endings, stats)` like `summarize_popup`,
+    or `None` if the file is under the thresholds or no leading candidate encoding can be searched
+    as bytes and decode the summary rows.  `endings` is the ending map if it had to be scanned,
+    so reading the file can skip scanning it again, otherwise `None`.
+    """
+
+    max_bytes, max_lines, context = options
+    if not max_bytes and not max_lines:
+        return None, None
+    with map_file(file_name) as data:
+        searchable = list(takewhile(lambda encoding: is_ascii_compatible(encoding.codec), encodings))
+        endings = None
+        if cache is not None:
+            with profile.phase("cache"):
+                hit = cache.get(file_name, file_key(file_name, data))
+            if hit is not None:
+                codec, endings = hit
+                searchable = [encoding for encoding in searchable if encoding.codec == codec]
+        if not searchable:
+            return None, None
+        scanned = None
+        if endings is None:
+            if max_bytes and len(data) <= max_bytes and not max_lines:
+                return None, None
+            with profile.phase("scan"):
+                endings = scanned = scan_bytes(data)
+        if not ((max_bytes and len(data) > max_bytes) or (max_lines and len(endings) + 1 > max_lines)):
+            return None, scanned
+        profile.count(bytes=len(data), lines=len(endings), runs=len(endings.kinds), mapped=True)
+        with profile.phase("summarize"):
+            for encoding in searchable:
+                try:
+                    text, sparse, _ = summarize_mapped(
+                        data, endings, encoding.codec, decode_start(data, encoding), context
+                    )
+                except UnicodeDecodeError:
+                    continue
+                return (text, sparse, endings.stats()), scanned
+    return None, scanned
+
+
+def read_popup(file_name, encodings, options, cache=None, profile=NULL_PROFILER):
+    """Read a file for the popup, summarizing it if it is over a threshold (call off the main thread)."""
+
+    summary, endings = summarize_file(file_name, encodings, options, cache, profile)
+    if summary is not None:
+        return summary
+    return summarize_popup(
+        read_file(file_name, encodings, ScanProgress(file_name), cache, profile, endings=endings),
+        getsize(file_name), options, profile
+    )
+
+
+def diff_popup(result, old, profile=NULL_PROFILER):
+    """
+    Compare a summarized popup result with the text the panel shows.
+
+    Returns `(text, endings, stats, old_size, span, offsets)` where `span` is the changed span from
+    `changed_span` and `offsets` are the row offsets of the text.
+    """
+
+    text, endings, stats = result
+    with profile.phase("diff"):
+        if isinstance(text, list):
+            text = ''.join(text)
+        span = changed_span(old, text)
+    with profile.phase("offsets"):
+        offsets = row_offsets(text)
+    return text, endings, stats, len(old), span, offsets
+
+
+def convert_buffers():
+    """Operate on unsaved buffers."""
+
+    return bool(sublime.load_settings("raw_line_edit.sublime-settings").get("operate_on_unsaved_buffers", False))
 
 
 def notify(msg):
@@ -148,41 +714,55 @@ def error(msg):
 
 
 class RawLineTextBuffer(object):
-    """Text buffer."""
+    """Unsaved buffers waiting in the state of the views they are written back to."""
+
+    @classmethod
+    def waiting(cls, view):
+        """Check if the view is waiting for a buffer."""
 
-    bfr = None
-    syntax = None
-    endings = None
-    view = None
+        state = VIEWS.get(view.id())
+        return state is not None and state.buffer is not None
 
     @classmethod
-    def set_buffer(cls, view):
-        """Read buffer from view and strip new line glyphs."""
+    def check_loading(cls, view, bfr):
+        """
+        Apply the buffer to the view once it is done loading.
 
-        cls.bfr = strip_buffer_glyphs(view)
+        The listener applies it from `on_load`; polling is only a safety net in case the event is missed.
+        """
+
+        get_view_state(view).buffer = bfr
+        if view.is_loading():
+            sublime.set_timeout(lambda: cls.poll_loading(view), LOAD_POLL)
+        else:
+            cls.apply_buffer(view)
 
     @classmethod
-    def clear_buffer(cls):
-        """Clear the buffer object."""
+    def on_load(cls, view):
+        """Apply the buffer if the loaded view is waiting for one."""
 
-        cls.bfr = None
-        cls.view = None
+        if cls.waiting(view):
+            cls.apply_buffer(view)
 
     @classmethod
-    def check_loading(cls, view):
-        """Check if file is done loading yet before applying buffer."""
+    def apply_buffer(cls, view):
+        """Write the buffer to the view."""
 
-        cls.view = view
-        sublime.set_timeout(cls.poll_loading, 300)
+        if view.is_valid():
+            view.run_command("write_raw_line_text")
+        else:
+            discard_view(view)
 
     @classmethod
-    def poll_loading(cls):
+    def poll_loading(cls, view):
         """Check if file is done loading, and if so, update view with buffer."""
 
-        if cls.view.is_loading():
-            sublime.set_timeout(cls.poll_loading, 300)
+        if not cls.waiting(view):
+            return
+        if view.is_loading():
+            sublime.set_timeout(lambda: cls.poll_loading(view), LOAD_POLL)
         else:
-            cls.view.run_command("write_raw_line_text")
+            cls.apply_buffer(view)
 
 
 class WriteRawLineTextCommand(sublime_plugin.TextCommand):
@@ -191,10 +771,12 @@ class WriteRawLineTextCommand(sublime_plugin.TextCommand):
     def run(self, edit):
         """Write the unsaved buffer to the view."""
 
-        if RawLineTextBuffer.bfr is None:
+        state = VIEWS.get(self.view.id())
+        if state is None or state.buffer is None:
             return
-        self.view.replace(edit, sublime.Region(0, self.view.size()), RawLineTextBuffer.bfr)
-        RawLineTextBuffer.clear_buffer()
+        bfr = state.buffer
+        state.buffer = None
+        self.view.replace(edit, sublime.Region(0, self.view.size()), bfr)
 
 
 class ToggleRawLineEditCommand(sublime_plugin.TextCommand):
@@ -208,6 +790,8 @@ class ToggleRawLineEditCommand(sublime_plugin.TextCommand):
             if sublime.ok_cancel_dialog("Raw Line Edit:\nFile has unsaved changes.  Save?", "Save"):
                 self.view.run_command("save")
 
+        profile = get_profiler("disable_rle")
+
         # Get the settings
         settings = self.view.settings()
         file_name = settings.get("RawLineEditFilename")
@@ -216,36 +800,43 @@ class ToggleRawLineEditCommand(sublime_plugin.TextCommand):
 
         # Strip the buffer of glyphs and prepare to write
         # the stripped buffer back to the view
+        bfr = None
         if buffer_endings is not None:
-            RawLineTextBuffer.set_buffer(self.view)
+            with profile.phase("strip"):
+                bfr = strip_buffer_glyphs(self.view)
+            profile.count(bytes=len(bfr))
 
         # Open temp view if only one view is open,
         # so not to close the window when we remove the view.
         window = self.view.window()
         temp = None
-        if len(window.views()) <= 1:
-            temp = window.new_file()
+        with profile.phase("close"):
+            if len(window.views()) <= 1:
+                temp = window.new_file()
 
-        # Close raw line view
-        window.focus_view(self.view)
-        window.run_command("close_file")
+            # Close raw line view
+            window.focus_view(self.view)
+            window.run_command("close_file")
 
         # Open the file on disk
-        new_view = window.open_file(file_name)
+        with profile.phase("open"):
+            new_view = window.open_file(file_name)
 
-        # Close temp view if needed
-        if temp is not None:
-            window.focus_view(temp)
-            window.run_command("close_file")
+            # Close temp view if needed
+            if temp is not None:
+                window.focus_view(temp)
+                window.run_command("close_file")
 
-        # Set view settings
-        window.focus_view(new_view)
-        new_view.set_syntax_file(syntax)
+            # Set view settings
+            window.focus_view(new_view)
+            new_view.set_syntax_file(syntax)
 
         # Reapply unsaved buffer if needed
         if buffer_endings is not None:
-            new_view.set_line_endings(buffer_endings)
-            RawLineTextBuffer.check_loading(new_view)
+            with profile.phase("reapply"):
+                new_view.set_line_endings(buffer_endings)
+                RawLineTextBuffer.check_loading(new_view, bfr)
+        profile.finish()
 
     def enable_rle(self, edit, file_name):
         """Enable raw line ending mode."""
@@ -268,7 +859,7 @@ class ToggleRawLineEditCommand(sublime_plugin.TextCommand):
             elif value == sublime.DIALOG_NO:
                 # Convert the unsaved buffer
                 if convert_buffers():
-                    self.enable_buffer_rle(edit, file_name)
+                    self.enable_buffer_rle(file_name)
                     return
                 else:
                     if file_name is None:
@@ -281,69 +872,74 @@ class ToggleRawLineEditCommand(sublime_plugin.TextCommand):
 
         if file_name is None or not exists(file_name):
             if convert_buffers():
-                self.enable_buffer_rle(edit)
+                self.enable_buffer_rle()
             else:
                 error("File must exist on disk!")
             return
 
         # Convert the file on disk to a raw line view
-        encoding = get_encoding(self.view)
-        try:
-            self.show_rle(edit, file_name, encoding)
-        except Exception:
-            self.show_rle(edit, file_name, "utf-8")
+        self.show_rle(file_name, candidates(self.view.encoding()))
 
-    def show_rle(self, edit, file_name, encoding):
+    def show_rle(self, file_name, encodings):
         """
         Read the file from disk converting actual lines to glyphs.
 
-        Present the info in raw line view.
+        Reading and scanning happen in the background; the info is presented in raw line view when done.
         """
-        with codecs.open(file_name, "r", encoding) as f:
-            text, lf, cr, crlf = process_lines(f.read())
-            self.view.replace(edit, sublime.Region(0, self.view.size()), text)
+
+        profile = get_profiler("show_rle")
+        cache = get_ending_cache()
+        run_async(
+            self.view,
+            lambda: read_file(file_name, encodings, ScanProgress(file_name), cache, profile, offsets=True),
+            lambda result: self.apply_rle(result, file_name, profile=profile)
+        )
+
+    def apply_rle(self, result, file_name=None, buffer_endings=None, profile=NULL_PROFILER):
+        """
+        Write the scanned text to the view and switch it to raw line mode.
+
+        `result` is the `(text, endings, offsets)` of a file or buffer.
+        """
+
+        text, endings, offsets = result
+        settings = self.view.settings()
+        if buffer_endings is not None:
+            settings.set("RawLineBuffer", buffer_endings)
+        with profile.phase("replace"):
+            self.view.set_read_only(False)
+            replace_text(self.view, sublime.Region(0, self.view.size()), text)
+        with profile.phase("settings"):
             self.view.set_line_endings("Unix")
-            settings = self.view.settings()
             settings.set("RawLineEdit", True)
             settings.set("RawLineEditSyntax", settings.get('syntax'))
-            settings.set("RawLineEditFilename", file_name)
+            if file_name is not None:
+                settings.set("RawLineEditFilename", file_name)
             self.view.assign_syntax(settings.get('syntax'))
             self.view.set_scratch(True)
             self.view.set_read_only(True)
 
-            self.update_phantoms(crlf, cr, lf)
+        with profile.phase("phantoms"):
+            update_phantoms(self.view, endings, offsets)
+        profile.finish()
 
     def read_buffer(self):
-        """Read the unsaved buffer and replace with new line glyphs."""
-
-        endings = {
-            "Windows": "\r\n",
-            "Unix": "\n",
-            "CR": "\r"
-        }
-        line_ending = endings[self.view.line_endings()]
-        bfr = []
-        for line in self.view.split_by_newlines(sublime.Region(0, self.view.size())):
-            bfr.append(self.view.substr(line) + line_ending)
-        return "".join(bfr)
-
-    def enable_buffer_rle(self, edit, file_name=None):
+        """Read the unsaved buffer with its line endings."""
+
+        return read_view_buffer(self.view)
+
+    def enable_buffer_rle(self, file_name=None):
         """Enable the raw line mode on an unsaved buffer."""
 
-        if self.view.is_read_only():
-            self.view.set_read_only(False)
-        settings = self.view.settings()
-        self.view.settings().set("RawLineBuffer", self.view.line_endings())
-        text, lf, cr, crlf = process_lines(self.read_buffer())
-        self.view.replace(edit, sublime.Region(0, self.view.size()), text)
-        self.view.set_line_endings("Unix")
-        settings.set("RawLineEdit", True)
-        settings.set("RawLineEditSyntax", self.view.settings().get('syntax'))
-        if file_name is not None:
-            settings.set("RawLineEditFilename", file_name)
-        self.view.set_scratch(True)
-        self.view.set_read_only(True)
-        self.update_phantoms(crlf, cr, lf)
+        profile = get_profiler("enable_buffer_rle")
+        with profile.phase("read_buffer"):
+            bfr = self.read_buffer()
+        line_endings = self.view.line_endings()
+        run_async(
+            self.view,
+            lambda: profile_scan_text(bfr, profile, offsets=True),
+            lambda result: self.apply_rle(result, file_name, line_endings, profile)
+        )
 
     def disable_buffer_rle(self, edit):
         """Disable the raw line mode on an unsaved buffer."""
@@ -366,40 +962,6 @@ class ToggleRawLineEditCommand(sublime_plugin.TextCommand):
         win.run_command("close_file")
         win.focus_view(new_view)
 
-    def update_phantoms(self, crlf, cr, lf):
-        """Update phantoms."""
-
-        for line in crlf:
-            pt = self.view.text_point(line + 1, 0) - 1
-            region = sublime.Region(pt)
-            self.view.add_phantom(
-                'rle_line_%d' % line,
-                region,
-                '%s<span>¤</span><span>¬</span>' % CSS,
-                sublime.LAYOUT_INLINE
-            )
-            self.view.add_regions('rle_line_%d_crlf' % line, [region], '', '', sublime.HIDDEN)
-        for line in cr:
-            pt = self.view.text_point(line + 1, 0) - 1
-            region = sublime.Region(pt)
-            self.view.add_phantom(
-                'rle_line_%d' % line,
-                region,
-                '%s<span>¤</span>' % CSS,
-                sublime.LAYOUT_INLINE
-            )
-            self.view.add_regions('rle_line_%d_cr' % line, [region], '', '', sublime.HIDDEN)
-        for line in lf:
-            pt = self.view.text_point(line + 1, 0) - 1
-            region = sublime.Region(pt)
-            self.view.add_phantom(
-                'rle_line_%d' % line,
-                region,
-                '%s<span>¬</span>' % CSS,
-                sublime.LAYOUT_INLINE
-            )
-            self.view.add_regions('rle_line_%d_lf' % line, [region], '', '', sublime.HIDDEN)
-
     def run(self, edit):
         """Toggle the raw line mode."""
 
@@ -455,119 +1017,134 @@ class PopupRawLineEditCommand(sublime_plugin.TextCommand):
                 error("File must exist on disk!")
             return
 
-        encoding = get_encoding(self.view)
-        try:
-            self.show_rle(file_name, encoding)
-        except Exception:
-            self.show_rle(file_name, "utf-8")
+        self.show_rle(file_name, candidates(self.view.encoding()))
 
     def read_buffer(self):
-        """Read the unsaved buffer and replace with new line glyphs."""
-
-        endings = {
-            "Windows": "\r\n",
-            "Unix": "\n",
-            "CR": "\r"
-        }
-        line_ending = endings[self.view.line_endings()]
-        bfr = []
-        for line in self.view.split_by_newlines(sublime.Region(0, self.view.size())):
-            bfr.append(self.view.substr(line) + line_ending)
-        return "".join(bfr)
+        """Read the unsaved buffer with its line endings."""
+
+        return read_view_buffer(self.view)
 
     def get_output_panel(self):
-        """Get output panel."""
+        """Get the output panel, reusing it if it already exists."""
 
         win = self.view.window()
         view = win.find_output_panel('raw_line_edit_view')
-        if view is not None:
-            win.destroy_output_panel('raw_line_edit_view')
-        return win.get_output_panel('raw_line_edit_view')
+        if view is None:
+            view = win.create_output_panel('raw_line_edit_view')
+        return view
+
+    def show_current(self, version):
+        """Show the panel if it already shows this version of the file, returning whether it was shown."""
+
+        win = self.view.window()
+        if POPUPS.get(win.id()) != version or win.find_output_panel('raw_line_edit_view') is None:
+            return False
+        win.run_command("show_panel", {"panel": "output.raw_line_edit_view"})
+        resume_rendering(win.find_output_panel('raw_line_edit_view'))
+        return True
+
+    def panel_text(self):
+        """Get the text the panel currently shows."""
+
+        view = self.view.window().find_output_panel('raw_line_edit_view')
+        return view.substr(sublime.Region(0, view.size())) if view is not None else ''
 
     def enable_buffer_rle(self, file_name=None):
         """Enable the raw line mode on an unsaved buffer."""
 
+        options = summary_options()
+        version = ('buffer', self.view.id(), self.view.change_count(), options)
+        if self.show_current(version):
+            return
+        profile = get_profiler("popup.enable_buffer_rle")
+        with profile.phase("read_buffer"):
+            bfr = self.read_buffer()
+        line_endings = self.view.line_endings()
+        with profile.phase("panel_text"):
+            old = self.panel_text()
+        run_async(
+            self.view,
+            lambda: diff_popup(
+                summarize_popup(profile_scan_text(bfr, profile), len(bfr), options, profile), old, profile
+            ),
+            lambda result: self.apply_rle(result, file_name, line_endings, version, profile)
+        )
+
+    def show_rle(self, file_name, encodings):
+        """Read and scan the file in the background and show the raw line view popup when done."""
+
+        options = summary_options()
+        st = stat(file_name)
+        version = ('file', file_name, st.st_size, st.st_mtime_ns, options)
+        if self.show_current(version):
+            return
+        profile = get_profiler("popup.show_rle")
+        cache = get_ending_cache()
+        with profile.phase("panel_text"):
+            old = self.panel_text()
+        run_async(
+            self.view,
+            lambda: diff_popup(read_popup(file_name, encodings, options, cache, profile), old, profile),
+            lambda result: self.apply_rle(result, file_name, version=version, profile=profile)
+        )
+
+    def apply_rle(self, result, file_name=None, buffer_endings=None, version=None, profile=NULL_PROFILER):
+        """
+        Write the scanned text to the output panel and show it.
+
+        Only the rows that differ from what the panel already shows are replaced.
+        In summary mode only the rows around mixed line endings are shown, prefixed with their line numbers.
+        """
+
+        text, endings, stats, old_size, span, offsets = result
+        if stats is not None:
+            show_stats(self.view, stats)
+            if not stats.mixed:
+                profile.finish()
+                return
         view = self.get_output_panel()
         view.set_line_endings("Unix")
         view.set_read_only(False)
-
-        RawLinesEditReplaceCommand.region = sublime.Region(0, view.size())
-        RawLinesEditReplaceCommand.text, lf, cr, crlf = process_lines(self.read_buffer())
-        view.run_command("raw_lines_edit_replace")
+        with profile.phase("replace"):
+            if view.size() != old_size:
+                # The panel changed since it was compared, so rewrite all of it.
+                span = (0, view.size(), len(text))
+            if span is not None:
+                begin, old_end, new_end = span
+                replace_text(
+                    view, sublime.Region(begin, old_end),
+                    text if begin == 0 and new_end == len(text) else text[begin:new_end]
+                )
+        profile.count(replaced=new_end - begin if span is not None else 0)
         view.sel().clear()
         settings = view.settings()
         view.assign_syntax(self.view.settings().get('syntax'))
         settings.set("RawLineEdit", True)
         settings.set("RawLineEditSyntax", self.view.settings().get('syntax'))
         settings.set("RawLineEditPopup", True)
-        settings.set("RawLineBuffer", self.view.line_endings())
+        settings.set("RawLineEditSummary", stats is not None)
+        if stats is not None:
+            # The summary holds mostly anomalies, so remember the kind that dominates the whole file.
+            settings.set("RawLineEditDominant", stats.dominant)
+        else:
+            settings.erase("RawLineEditDominant")
+        if buffer_endings is not None:
+            settings.set("RawLineBuffer", buffer_endings)
+        else:
+            settings.erase("RawLineBuffer")
         if file_name is not None:
             settings.set("RawLineEditFilename", file_name)
+        else:
+            settings.erase("RawLineEditFilename")
         view.set_scratch(True)
         view.set_read_only(True)
 
-        self.update_phantoms(view, crlf, cr, lf)
-        self.view.window().run_command("show_panel", {"panel": "output.raw_line_edit_view"})
-
-    def show_rle(self, file_name, encoding):
-        """Show the raw line view popup."""
-
-        try:
-            view = self.get_output_panel()
-            view.set_line_endings("Unix")
-            with codecs.open(file_name, "r", encoding) as f:
-                view.set_read_only(False)
-                RawLinesEditReplaceCommand.region = sublime.Region(0, view.size())
-                RawLinesEditReplaceCommand.text, lf, cr, crlf = process_lines(f.read())
-                view.run_command("raw_lines_edit_replace")
-                view.sel().clear()
-                view.assign_syntax(self.view.settings().get('syntax'))
-                view.settings().set("RawLineEditSyntax", self.view.settings().get('syntax'))
-                view.settings().set("RawLineEdit", True)
-                view.settings().set("RawLineEditFilename", file_name)
-                view.settings().set("RawLineEditPopup", True)
-                view.set_scratch(True)
-                view.set_read_only(True)
-
-                self.update_phantoms(view, crlf, cr, lf)
-                self.view.window().run_command("show_panel", {"panel": "output.raw_line_edit_view"})
-        except Exception:
-            self.view.window().run_command("hide_panel", {"panel": "output.raw_line_edit_view"})
-            raise
-
-    def update_phantoms(self, view, crlf, cr, lf):
-        """Update phantoms."""
-
-        for line in crlf:
-            pt = view.text_point(line + 1, 0) - 1
-            region = sublime.Region(pt)
-            view.add_phantom(
-                'rle_line_%d' % line,
-                region,
-                '%s<span>¤</span><span>¬</span>' % CSS,
-                sublime.LAYOUT_INLINE
-            )
-            view.add_regions('rle_line_%d_crlf' % line, [region], '', '', sublime.HIDDEN)
-        for line in cr:
-            pt = view.text_point(line + 1, 0) - 1
-            region = sublime.Region(pt)
-            view.add_phantom(
-                'rle_line_%d' % line,
-                region,
-                '%s<span>¤</span>' % CSS,
-                sublime.LAYOUT_INLINE
-            )
-            view.add_regions('rle_line_%d_cr' % line, [region], '', '', sublime.HIDDEN)
-        for line in lf:
-            pt = view.text_point(line + 1, 0) - 1
-            region = sublime.Region(pt)
-            view.add_phantom(
-                'rle_line_%d' % line,
-                region,
-                '%s<span>¬</span>' % CSS,
-                sublime.LAYOUT_INLINE
-            )
-            view.add_regions('rle_line_%d_lf' % line, [region], '', '', sublime.HIDDEN)
+        with profile.phase("phantoms"):
+            update_phantoms(view, endings, offsets)
+        win = self.view.window()
+        POPUPS[win.id()] = version
+        win.run_command("show_panel", {"panel": "output.raw_line_edit_view"})
+        profile.finish()
 
     def run(self, edit):
         """Popup panel with raw line view."""
@@ -584,125 +1161,365 @@ class RawLineInsertCommand(sublime_plugin.TextCommand):
     def run(self, edit, style="Unix"):
         """Insert text."""
 
-        for s in reversed(self.view.sel()):
-            line_regions = self.view.lines(s)
-            for region in line_regions:
-                row = self.view.rowcol(region.begin())[0]
-                if row >= 0:
-                    r = None
-                    for line_type in ('crlf', 'cr', 'lf'):
-                        temp = self.view.get_regions('rle_line_%d_%s' % (row, line_type))
-                        if temp:
-                            r = temp[0]
-                            break
-                    if r is not None:
-                        self.view.erase_regions('rle_line_%d_%s' % (row, line_type))
-                        self.view.erase_phantoms('rle_line_%d' % row)
-
-                        pt = self.view.text_point(row + 1, 0) - 1
-                        r = sublime.Region(pt)
-                        if style == "Unix":
-                            temp = '%s<span>¬</span>'
-                            line_type = 'lf'
-                        elif style == "Windows":
-                            temp = '%s<span>¤</span><span>¬</span>'
-                            line_type = 'crlf'
-                        else:
-                            temp = '%s<span>¤</span>'
-                            line_type = 'cr'
-                        self.view.add_phantom(
-                            'rle_line_%d' % row,
-                            r,
-                            temp % CSS,
-                            sublime.LAYOUT_INLINE
-                        )
-                        self.view.add_regions('rle_line_%d_%s' % (row, line_type), [r], '', '', sublime.HIDDEN)
+        profile = get_profiler("insert")
+        kind = STYLES.get(style, CR)
+        endings = get_ending_map(self.view)
+        with profile.phase("selection"):
+            rows = selected_rows(self.view)
+        # Rows without a line ending (the last line) are ignored by the map.
+        with profile.phase("set_range"):
+            for start, end in rows:
+                endings.set_range(start, end, kind)
+        profile.count(selections=len(rows), lines=len(endings), runs=len(endings.kinds))
+        with profile.phase("regions"):
+            update_ending_regions(self.view, endings)
+        with profile.phase("phantoms"):
+            get_renderer(self.view).render()
+        profile.finish()
+
+
+class RawLineEditGotoMixedEndingCommand(sublime_plugin.TextCommand):
+    """Move to the next or previous line whose ending differs from the most common one."""
+
+    def run(self, edit, forward=True):
+        """Jump to the line ending, wrapping around at the end of the file."""
+
+        view = self.view
+        endings = get_ending_map(view)
+        # A summary popup's map only holds the rows around anomalies, so use the whole file's dominant kind.
+        kind = view.settings().get("RawLineEditDominant", endings.dominant)
+        if kind is None or endings.uniform == kind:
+            notify("No mixed line endings.")
+            return
 
+        sels = view.sel()
+        pt = (sels[-1].end() if forward else sels[0].begin()) if len(sels) else 0
+        row = view.rowcol(pt)[0]
+        target = endings.find_other(row, kind, forward)
+        if target is None:
+            target = endings.find_other(-1 if forward else len(endings), kind, forward)
+            notify("Wrapped to the %s of the file." % ("start" if forward else "end"))
+
+        # Place the cursor on the line ending glyph.
+        pt = row_points(view)(target + 1) - 1
+        sels.clear()
+        sels.add(sublime.Region(pt))
+        view.show_at_center(pt)
+
+    def is_enabled(self, forward=True):
+        """Check if the view is in raw line mode."""
+
+        return bool(self.view.settings().get("RawLineEdit", False))
 
-class RawLinesEditReplaceCommand(sublime_plugin.TextCommand):
-    """Replace text in view."""
 
-    text = None
-    region = None
+class RawLineEditConvertEndingsCommand(sublime_plugin.TextCommand):
+    """Convert every line ending of a file."""
+
+    def run(self, edit, style="Unix"):
+        """Convert the raw line view, or the file on disk when not in raw line mode."""
+
+        kind = STYLES.get(style, CR)
+        if self.view.settings().get("RawLineEdit", False):
+            endings = get_ending_map(self.view)
+            endings.set_range(0, len(endings), kind)
+            update_ending_regions(self.view, endings)
+            get_renderer(self.view).render()
+            return
+
+        file_name = self.view.file_name()
+        if file_name is None or not exists(file_name):
+            error("File must exist on disk!")
+            return
+        if self.view.is_dirty():
+            error("File has unsaved changes.  Save it before converting it on disk.")
+            return
+
+        encoding = resolve(self.view.encoding())
+        run_async(
+            self.view,
+            lambda: convert_file(file_name, kind, encoding),
+            lambda changed: self.converted(changed, style)
+        )
+
+    def converted(self, changed, style):
+        """Reload the view after the file on disk was converted."""
+
+        if changed:
+            self.view.run_command("revert")
+            notify("Line endings converted to %s." % style)
+        else:
+            notify("Line endings are already %s." % style)
+
+    def is_enabled(self, style="Unix"):
+        """Disable in the popup panel."""
+
+        return not self.view.settings().get('RawLineEditPopup', False)
+
+
+class RawLineEditStatsCommand(sublime_plugin.TextCommand):
+    """Show line ending statistics without entering raw line mode."""
+
+    def run(self, edit):
+        """Compute the statistics from the ending map or a fast scan of the file on disk."""
+
+        view = self.view
+        if view.settings().get("RawLineEdit", False):
+            show_stats(view, get_ending_map(view).stats())
+            return
+
+        file_name = view.file_name()
+        if file_name is None or not exists(file_name):
+            error("File must exist on disk!")
+            return
+
+        codec = resolve(view.encoding()).codec
+        run_async(view, lambda: scan_file_endings(file_name, codec).stats(), lambda stats: show_stats(view, stats))
+
+
+class RawLineEditAuditCommand(sublime_plugin.WindowCommand):
+    """Audit the line endings of every file in the window's folders."""
+
+    def default_ending(self):
+        """Get the ending kind new files default to."""
+
+        style = sublime.load_settings("Preferences.sublime-settings").get("default_line_ending", "system")
+        if style == "system":
+            style = "windows" if sublime.platform() == "windows" else "unix"
+        return CRLF if style == "windows" else LF
+
+    def run(self):
+        """Scan the files in the background and show the results panel when done."""
+
+        folders = self.window.folders()
+        if not folders:
+            error("No folders are open in the window!")
+            return
+        window_id = self.window.id()
+        if window_id in AUDITING:
+            notify("Line ending audit is still running.")
+            return
+        AUDITING.add(window_id)
+
+        prefs = sublime.load_settings("Preferences.sublime-settings")
+        skip_dirs = prefs.get("folder_exclude_patterns", [])
+        skip_files = prefs.get("file_exclude_patterns", []) + prefs.get("binary_file_patterns", [])
+        codec = resolve(prefs.get("default_encoding", "UTF-8")).codec
+        workers = int(sublime.load_settings("raw_line_edit.sublime-settings").get("audit_workers", 4))
+        kind = self.default_ending()
+
+        def worker():
+            """Audit the files."""
+
+            results = []
+            try:
+                files = list(iter_files(folders, skip_dirs, skip_files))
+                AUDIT_CACHE.prune(files, folders)
+                for count, result in enumerate(audit(files, codec, AUDIT_CACHE, workers), 1):
+                    if count % 100 == 0:
+                        sublime.status_message("RawLineEdit: auditing line endings (%d/%d)" % (count, len(files)))
+                    results.append(result)
+            except Exception as e:
+                msg = "Line ending audit failed: %s" % e
+                sublime.set_timeout(lambda: error(msg), 0)
+                return
+            finally:
+                AUDITING.discard(window_id)
+            sublime.set_timeout(lambda: self.show_results(results, kind), 0)
+
+        # A large audit would hold up Sublime's shared async thread, so it gets a thread of its own.
+        threading.Thread(target=worker, name="RawLineEditAudit", daemon=True).start()
+
+    def show_results(self, results, kind):
+        """Show the files with mixed or non-default line endings in the results panel."""
+
+        flagged = []
+        scanned = 0
+        for path, stats, err, cached in results:
+            scanned += not cached
+            if err is not None:
+                flagged.append("%s:1: error: %s" % (path, err))
+            elif stats is not None and stats.mixed:
+                flagged.append("%s:%d: %s" % (path, stats.first + 1, stats.summary()))
+            elif stats is not None and stats.dominant not in (None, kind):
+                flagged.append(
+                    "%s:1: %s, default is %s" % (path, stats.summary(), KIND_NAMES[kind].upper())
+                )
+
+        lines = [
+            "Line ending audit: %d of %d files need attention (%d scanned, %d cached)" % (
+                len(flagged), len(results), scanned, len(results) - scanned
+            ),
+            ""
+        ] + flagged
+
+        view = self.window.create_output_panel("raw_line_edit_audit")
+        settings = view.settings()
+        settings.set("result_file_regex", AUDIT_RESULT_REGEX)
+        settings.set("line_numbers", False)
+        settings.set("word_wrap", False)
+        view.set_read_only(False)
+        replace_text(view, sublime.Region(0, view.size()), "\n".join(lines) + "\n")
+        view.set_read_only(True)
+        self.window.run_command("show_panel", {"panel": "output.raw_line_edit_audit"})
+        notify(lines[0])
+
+
+class RawLinesEditReplaceCommand(sublime_plugin.TextCommand):
+    """Replace text in view with the text waiting in its state (text may be given as a list of chunks)."""
 
     def run(self, edit):
         """Replace text."""
 
-        cls = RawLinesEditReplaceCommand
-        if cls.text is not None and cls.region is not None:
-            self.view.replace(edit, cls.region, cls.text)
-        cls.text = None
-        cls.region = None
+        state = VIEWS.get(self.view.id())
+        if state is None:
+            return
+        text, region = state.text, state.region
+        state.text = None
+        state.region = None
+        if text is not None and region is not None:
+            if isinstance(text, list):
+                replace_chunks(self.view, edit, region, text)
+            else:
+                self.view.replace(edit, region, text)
+
+
+class RawLinesEditEndingsCommand(sublime_plugin.TextCommand):
+    """
+    Convert a raw line view's buffer to its real line endings for saving, or restore it.
+
+    Uniform endings are handled by the view's line ending setting alone. Otherwise, the
+    view is saved with Unix endings and only the runs of other endings are rewritten.
+    When runs are too short for that to pay off, the whole buffer is rewritten at once.
+    """
+
+    def run(self, edit, restore=False):
+        """Convert or restore the buffer."""
+
+        view = self.view
+        endings = get_ending_map(view)
+        kind = endings.uniform if len(endings) else LF
+        if kind is not None:
+            view.set_line_endings(LINE_ENDINGS[LF if restore else kind])
+            return
+
+        if not restore:
+            view.set_line_endings(LINE_ENDINGS[LF])
+            if dense_runs(endings):
+                # A single span of the whole buffer, without a kind.
+                region = sublime.Region(0, view.size())
+                get_view_state(view).save_spans = [(0, region.end(), len(endings), None)]
+                view.replace(edit, region, restore_endings(view.substr(region), endings))
+                return
+
+            # Spans of the newlines in each run that isn't LF, in normalized buffer offsets.
+            point = row_points(view)
+            spans = [
+                (point(start + 1) - 1, point(start + count), count, kind)
+                for start, count, kind in endings.runs() if kind != LF
+            ]
+            get_view_state(view).save_spans = spans
+            # Last run first, so the offsets of the runs before it stay valid.
+            for begin, end, count, kind in reversed(spans):
+                region = sublime.Region(begin, end)
+                view.replace(edit, region, view.substr(region).replace('\n', NEWLINES[kind]))
+        else:
+            state = get_view_state(view)
+            spans = state.save_spans or []
+            state.save_spans = None
+            # First run first, so everything before a run is already normalized.
+            for begin, end, count, kind in spans:
+                if kind is None:
+                    region = sublime.Region(0, view.size())
+                    view.replace(edit, region, view.substr(region).replace('\r\n', '\n').replace('\r', '\n'))
+                    continue
+                # A CRLF span grew by one character per ending.
+                region = sublime.Region(begin, end + (count if kind == CRLF else 0))
+                view.replace(edit, region, view.substr(region).replace(NEWLINES[kind], '\n'))
+            if spans:
+                update_ending_regions(view, endings)
+                get_renderer(view).render()
 
 
 class RawLineEditListener(sublime_plugin.EventListener):
     """RawLineEdit Listener."""
 
     def on_pre_save(self, view):
-        """Convert raw line mode back to normal mode before save."""
+        """Write the real line endings into the buffer before save."""
 
         if view.settings().get("RawLineEdit", False) and not view.settings().get('RawLineEditPopup', False):
-            RawLinesEditReplaceCommand.region = sublime.Region(0, view.size())
-            RawLinesEditReplaceCommand.text = strip_buffer_glyphs(view)
-            view.set_read_only(False)
-            view.run_command("raw_lines_edit_replace")
-            view.set_read_only(True)
+            profile = get_profiler("on_pre_save")
+            with profile.phase("convert"):
+                view.set_read_only(False)
+                view.run_command("raw_lines_edit_endings")
+                view.set_read_only(True)
+            endings = get_ending_map(view)
+            profile.count(lines=len(endings), runs=len(endings.kinds))
+            profile.finish()
 
     def on_post_save(self, view):
         """Convert view back to raw line mode after save."""
 
         if view.settings().get("RawLineEdit", False) and not view.settings().get('RawLineEditPopup', False):
+            profile = get_profiler("on_post_save")
             file_name = view.file_name()
             if file_name is not None:
                 view.settings().set("RawLineEditFilename", file_name)
             if view.settings().set("RawLineBuffer", None) is not None:
                 view.settings().erase("RawLineBuffer")
 
-            view.set_read_only(False)
-            RawLinesEditReplaceCommand.region = sublime.Region(0, view.size())
-            RawLinesEditReplaceCommand.text, lf, cr, crlf = process_lines(
-                view.substr(RawLinesEditReplaceCommand.region)
-            )
-            view.run_command("raw_lines_edit_replace")
-
-            for line in crlf:
-                pt = view.text_point(line + 1, 0) - 1
-                region = sublime.Region(pt)
-                view.add_phantom(
-                    'rle_line_%d' % line,
-                    region,
-                    '%s<span>¤</span><span>¬</span>' % CSS,
-                    sublime.LAYOUT_INLINE
-                )
-                view.add_regions('rle_line_%d_crlf' % line, [region], '', '', sublime.HIDDEN)
-            for line in cr:
-                pt = view.text_point(line + 1, 0) - 1
-                region = sublime.Region(pt)
-                view.add_phantom(
-                    'rle_line_%d' % line,
-                    region,
-                    '%s<span>¤</span>' % CSS,
-                    sublime.LAYOUT_INLINE
-                )
-                view.add_regions('rle_line_%d_cr' % line, [region], '', '', sublime.HIDDEN)
-            for line in lf:
-                pt = view.text_point(line + 1, 0) - 1
-                region = sublime.Region(pt)
-                view.add_phantom(
-                    'rle_line_%d' % line,
-                    region,
-                    '%s<span>¬</span>' % CSS,
-                    sublime.LAYOUT_INLINE
-                )
-                view.add_regions('rle_line_%d_lf' % line, [region], '', '', sublime.HIDDEN)
+            # The ending map is unchanged by saving, so only undo the conversion
+            # and re-render what the conversion touched.
+            with profile.phase("restore"):
+                view.set_read_only(False)
+                view.run_command("raw_lines_edit_endings", {"restore": True})
+                view.set_scratch(True)
+                view.set_read_only(True)
+            endings = get_ending_map(view)
+            profile.count(lines=len(endings), runs=len(endings.kinds))
+            profile.finish()
+
+            # The saved file's endings are exactly the view's ending map.
+            cache = get_ending_cache()
+            if file_name is not None and cache is not None:
+                # The file was written with the view's encoding.
+                codec = resolve(view.encoding()).codec
+                endings = EndingMap.from_bytes(endings.to_bytes())
+                sublime.set_timeout_async(lambda: store_ending_map(cache, file_name, None, codec, endings), 0)
+
+    def on_load(self, view):
+        """Reapply an unsaved buffer to the view it was waiting for."""
+
+        RawLineTextBuffer.on_load(view)
+
+    def on_load_async(self, view):
+        """Show line ending statistics of loaded files."""
+
+        if status_bar_stats():
+            update_stats_async(view)
+
+    def on_post_save_async(self, view):
+        """Refresh line ending statistics of saved files."""
+
+        if status_bar_stats():
+            update_stats_async(view)
+
+    def on_activated(self, view):
+        """Resume following the viewport of raw line views brought back on screen."""
+
+        resume_rendering(view)
+
+    def on_close(self, view):
+        """Release the state of closed raw line views."""
 
-            view.set_scratch(True)
-            view.set_read_only(True)
+        discard_view(view)
 
     def on_query_context(self, view, key, operator, operand, match_all):
         """Handle raw line mode shortcuts."""
 
         settings = view.settings()
+        if key == "raw_line_edit_navigation":
+            # Navigation also works in the read only popup panel.
+            return settings.get("RawLineEdit", False)
         return (
             settings.get("RawLineEdit", False) and key.startswith("raw_line_edit") and
             not settings.get('RawLineEditPopup', False)
@@ -0,0 +1,8 @@
+"""
+Raw Line Edit library.
+
+Sublime independent line ending logic used by the plugin.
+
+Licensed under MIT
+Copyright (c) 2013 - 2016 Isaac Muse <isaacmuse@gmail.com>
+"""
@@ -0,0 +1,132 @@
+"""
+Line ending audit.
+
+Collect the line ending statistics of many files with a pool of worker threads.
+Statistics are cached by path and only rescanned once a file's size or
+modification time changes.
+
+Licensed under MIT
+Copyright (c) 2013 - 2016 Isaac Muse <isaacmuse@gmail.com>
+"""
+import fnmatch
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from .scan import scan_file_endings
+
+# Folders never descended into.
+SKIP_DIRS = ('.git', '.hg', '.svn', '.tox', '__pycache__')
+
+# Files with a null byte in this many leading bytes are treated as binary and skipped.
+BINARY_SNIFF = 8000
+
+WORKERS = 4
+
+AuditResult = namedtuple('AuditResult', ['path', 'stats', 'error', 'cached'])
+
+
+def iter_files(paths, skip_dirs=SKIP_DIRS, skip_files=()):
+    """Yield the files of the paths, walking folders; `skip_dirs` and `skip_files` are `fnmatch` patterns."""
+
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if not any(fnmatch.fnmatch(d, p) for p in skip_dirs))
+            for name in sorted(files):
+                if not any(fnmatch.fnmatch(name, p) for p in skip_files):
+                    yield os.path.join(root, name)
+
+
+def is_binary(file_name):
+    """Check if the file looks binary."""
+
+    with open(file_name, 'rb') as f:
+        return b'\0' in f.read(BINARY_SNIFF)
+
+
+class AuditCache(object):
+    """Line ending statistics of files keyed by path, valid while a file's size and modification time are unchanged."""
+
+    def __init__(self):
+        """Initialize."""
+
+        self.entries = {}
+
+    def __len__(self):
+        """Number of cached files."""
+
+        return len(self.entries)
+
+    def get(self, path, key):
+        """Return `(True, stats)` if the file is cached under the `(size, mtime)` key, otherwise `(False, None)`."""
+
+        entry = self.entries.get(path)
+        if entry is not None and entry[0] == key:
+            return True, entry[1]
+        return False, None
+
+    def set(self, path, key, stats):  # noqa: A003
+        """Cache the statistics of a file (`None` for binary files)."""
+
+        self.entries[path] = (key, stats)
+
+    def prune(self, paths, roots=None):
+        """
+        Drop the files that aren't in `paths`.
+
+        With `roots`, only files within those files and folders are dropped, so the files of
+        other audits sharing the cache are kept.
+        """
+
+        paths = set(paths)
+        if roots is not None:
+            roots = tuple(os.path.normpath(r) for r in roots)
+            prefixes = tuple(r.rstrip(os.sep) + os.sep for r in roots)
+        for path in [p for p in self.entries if p not in paths]:
+            if roots is None or path in roots or path.startswith(prefixes):
+                del self.entries[path]
+
+
+def file_key(path):
+    """Return the `(size, mtime)` cache key of a file."""
+
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def audit_file(path, encoding):
+    """Scan a file returning its statistics, or `None` if it is binary."""
+
+    if is_binary(path):
+        return None
+    return scan_file_endings(path, encoding).stats()
+
+
+def audit(files, encoding, cache=None, workers=WORKERS):
+    """
+    Yield an `AuditResult` for every file, in order, scanning the files that aren't cached in a thread pool.
+
+    Binary files have no statistics.  Results for files that can't be read carry the error message.
+    """
+
+    def work(path):
+        """Scan a file unless it is cached."""
+
+        try:
+            key = file_key(path)
+            if cache is not None:
+                found, stats = cache.get(path, key)
+                if found:
+                    return AuditResult(path, stats, None, True)
+            stats = audit_file(path, encoding)
+            if cache is not None:
+                cache.set(path, key, stats)
+            return AuditResult(path, stats, None, False)
+        except (OSError, UnicodeDecodeError) as e:
+            return AuditResult(path, None, str(e), False)
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        for result in executor.map(work, files):
+            yield result
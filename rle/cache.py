@@ -0,0 +1,137 @@
+"""
+Ending map cache.
+
+Persist the ending maps of scanned files so an unchanged file never has to be
+scanned twice.  Entries are keyed by path, size, modification time and a hash of
+the start and end of the file, and the least recently used entries are evicted
+once the cache grows over its size limit.
+
+Licensed under MIT
+Copyright (c) 2013 - 2016 Isaac Muse <isaacmuse@gmail.com>
+"""
+import hashlib
+import os
+import struct
+import tempfile
+import zlib
+from .endings import EndingMap
+
+MAGIC = b'RLEC\x01'
+
+# Entry header: size, modification time (ns), hash and length of the codec name.
+HEADER = struct.Struct('<QqIB')
+
+# Bytes hashed at the start and at the end of a file.
+HASH_SPAN = 64 * 1024
+
+MAX_SIZE = 16 * 1024 * 1024
+
+EXTENSION = '.rlemap'
+
+
+def fast_hash(data):
+    """Hash the size and the first and last `HASH_SPAN` bytes of the data."""
+
+    size = len(data)
+    crc = zlib.crc32(struct.pack('<Q', size))
+    crc = zlib.crc32(data[:HASH_SPAN], crc)
+    if size > HASH_SPAN:
+        crc = zlib.crc32(data[max(size - HASH_SPAN, HASH_SPAN):], crc)
+    return crc & 0xFFFFFFFF
+
+
+def file_key(file_name, data):
+    """Return the `(size, mtime, hash)` key of a file given its content."""
+
+    return len(data), os.stat(file_name).st_mtime_ns, fast_hash(data)
+
+
+class EndingCache(object):
+    """
+    On disk cache of ending maps.
+
+    Every file gets one entry in `folder` holding its key, the codec it was
+    decoded with, and its serialized ending map.
+    """
+
+    def __init__(self, folder, max_size=MAX_SIZE):
+        """Initialize."""
+
+        self.folder = folder
+        self.max_size = max_size
+
+    def entry(self, file_name):
+        """Return the path of the entry of a file."""
+
+        name = os.path.normcase(os.path.abspath(file_name)).encode('utf-8', 'surrogateescape')
+        return os.path.join(self.folder, hashlib.sha1(name).hexdigest() + EXTENSION)
+
+    def get(self, file_name, key):
+        """Return `(codec, EndingMap)` of a file if it is cached under the key, otherwise `None`."""
+
+        entry = self.entry(file_name)
+        try:
+            with open(entry, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        start = len(MAGIC) + HEADER.size
+        if not data.startswith(MAGIC) or len(data) < start:
+            return None
+        size, mtime, crc, length = HEADER.unpack_from(data, len(MAGIC))
+        if (size, mtime, crc) != key:
+            return None
+        try:
+            codec = data[start:start + length].decode('ascii')
+            endings = EndingMap.from_bytes(data[start + length:])
+        except ValueError:
+            return None
+
+        # Mark the entry as recently used.
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        return codec, endings
+
+    def put(self, file_name, key, codec, endings):
+        """Cache the ending map of a file decoded with the codec."""
+
+        codec = codec.encode('ascii')
+        data = MAGIC + HEADER.pack(key[0], key[1], key[2], len(codec)) + codec + endings.to_bytes()
+        if len(data) > self.max_size:
+            return
+        os.makedirs(self.folder, exist_ok=True)
+        fd, temp = tempfile.mkstemp(dir=self.folder)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp, self.entry(file_name))
+        finally:
+            if os.path.exists(temp):
+                os.remove(temp)
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits its size limit."""
+
+        entries = []
+        total = 0
+        for name in os.listdir(self.folder):
+            if name.endswith(EXTENSION):
+                try:
+                    st = os.stat(os.path.join(self.folder, name))
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, name, st.st_size))
+                total += st.st_size
+        entries.sort()
+        for _, name, size in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(os.path.join(self.folder, name))
+            except OSError:
+                pass
+            total -= size
@@ -0,0 +1,147 @@
+"""
+Command line interface.
+
+Report, check and convert the line endings of files outside of Sublime Text.
+Files are processed in parallel by a pool of worker processes and results are
+printed as soon as they are ready.
+
+Licensed under MIT
+Copyright (c) 2013 - 2016 Isaac Muse <isaacmuse@gmail.com>
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+from .audit import is_binary, iter_files
+from .convert import convert_file
+from .encoding import resolve
+from .endings import KIND_NAMES
+from .scan import scan_file_endings
+
+OK = 0
+MIXED = 1
+ERROR = 2
+
+
+def _report(job):
+    """Scan a file returning `(path, stats dictionary, error)`; binary files give no statistics."""
+
+    file_name, encoding = job
+    try:
+        if is_binary(file_name):
+            return file_name, None, None
+        return file_name, scan_file_endings(file_name, encoding.codec).stats(), None
+    except (OSError, UnicodeDecodeError) as e:
+        return file_name, None, str(e)
+
+
+def _convert(job):
+    """Convert a file returning `(path, changed, error)`."""
+
+    file_name, encoding, kind = job
+    try:
+        if is_binary(file_name):
+            return file_name, False, None
+        return file_name, convert_file(file_name, kind, encoding), None
+    except (OSError, UnicodeError) as e:
+        return file_name, False, str(e)
+
+
+def imap(func, jobs, processes):
+    """Map the jobs over a process pool yielding results in order as they finish."""
+
+    if processes == 1:
+        for job in jobs:
+            yield func(job)
+        return
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        for result in pool.imap(func, jobs, chunksize=16):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def report(args, out):
+    """Print the line ending statistics of every file; `check` only prints files that fail."""
+
+    expected = KIND_NAMES.index(args.ending) if getattr(args, 'ending', None) else None
+    status = OK
+    jobs = ((file_name, args.encoding) for file_name in iter_files(args.paths))
+    for file_name, stats, err in imap(_report, jobs, args.jobs):
+        if err is not None:
+            sys.stderr.write('%s: error: %s\n' % (file_name, err))
+            status = ERROR
+            continue
+        if stats is None:
+            continue
+        failed = stats.mixed or (expected is not None and stats.dominant not in (None, expected))
+        if failed and status == OK:
+            status = MIXED
+        if args.command == 'check' and not failed:
+            continue
+        if args.json:
+            record = stats.to_dict()
+            record['path'] = file_name
+            out.write(json.dumps(record, sort_keys=True) + '\n')
+        else:
+            out.write('%s: %s\n' % (file_name, stats.summary()))
+        out.flush()
+    return status if args.command == 'check' else status & ERROR
+
+
+def convert(args, out):
+    """Convert the line endings of every file."""
+
+    kind = KIND_NAMES.index(args.to)
+    status = OK
+    jobs = ((file_name, args.encoding, kind) for file_name in iter_files(args.paths))
+    for file_name, changed, err in imap(_convert, jobs, args.jobs):
+        if err is not None:
+            sys.stderr.write('%s: error: %s\n' % (file_name, err))
+            status = ERROR
+        elif changed:
+            out.write('%s: converted to %s\n' % (file_name, args.to.upper()))
+            out.flush()
+    return status
+
+
+def main(argv=None, out=None):
+    """Run the command line interface and return the exit status."""
+
+    parser = argparse.ArgumentParser(prog='python -m rle', description='Report, check and convert line endings.')
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('paths', nargs='+', help='Files, or folders to walk.')
+    common.add_argument(
+        '--encoding', default='utf-8', type=resolve, help='Encoding of the files (default: %(default)s).'
+    )
+    common.add_argument(
+        '-j', '--jobs', type=int, default=os.cpu_count() or 1, help='Worker processes (default: one per CPU).'
+    )
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    sub = commands.add_parser('report', parents=[common], help='Print the line ending statistics of each file.')
+    sub.add_argument('--json', action='store_true', help='Print JSON lines.')
+
+    sub = commands.add_parser(
+        'check', parents=[common],
+        help='Print files with mixed line endings and exit with %d if there are any.' % MIXED
+    )
+    sub.add_argument('--json', action='store_true', help='Print JSON lines.')
+    sub.add_argument('--ending', choices=KIND_NAMES, help='Also fail files whose line endings are not this type.')
+
+    sub = commands.add_parser('convert', parents=[common], help='Convert every line ending of each file.')
+    sub.add_argument('--to', choices=KIND_NAMES, required=True, help='Line ending type to convert to.')
+
+    args = parser.parse_args(argv)
+    args.jobs = max(args.jobs, 1)
+    if out is None:
+        out = sys.stdout
+    if args.command == 'convert':
+        return convert(args, out)
+    return report(args, out)
@@ -0,0 +1,170 @@
+"""
+Line ending conversion.
+
+Rewrite every line ending of a file on disk by streaming it through a
+temporary file, so memory use stays constant regardless of file size.
+Normalized text is given back its original line endings one run at a time.
+
+Licensed under MIT
+Copyright (c) 2013 - 2016 Isaac Muse <isaacmuse@gmail.com>
+"""
+import codecs
+import os
+import shutil
+import tempfile
+from itertools import chain
+from .encoding import UTF8, decode_start
+from .endings import LF, NEWLINES
+from .scan import CHUNK_SIZE, is_ascii_compatible, map_file
+from .summary import skip_rows
+
+# Endings with more than one run per this many rows are restored row by row.
+DENSE_RUNS = 2
+
+
+class EndingConverter(object):
+    """
+    Convert the line endings of chunked text to a single newline.
+
+    Works on `str` or, given byte literals, on ASCII compatible `bytes` chunks.
+    A carriage return at the end of a chunk is held back in case the next chunk
+    starts with its newline.  `changed` records whether any ending was rewritten.
+    """
+
+    def __init__(self, newline, cr='\r', lf='\n'):
+        """Initialize."""
+
+        self.newline = newline
+        self.cr = cr
+        self.lf = lf
+        self.changed = False
+
+    def is_converted(self, chunk):
+        """Check if every ending in the chunk already is the target newline."""
+
+        cr = chunk.count(self.cr)
+        lf = chunk.count(self.lf)
+        if self.newline == self.lf:
+            return not cr
+        if self.newline == self.cr:
+            return not lf
+        return cr == lf == chunk.count(self.cr + self.lf)
+
+    def convert(self, chunks):
+        """Yield the converted chunks."""
+
+        cr = self.cr
+        lf = self.lf
+        pending = False
+        for chunk in chunks:
+            if pending:
+                chunk = cr + chunk
+                pending = False
+            if chunk.endswith(cr):
+                chunk = chunk[:-1]
+                pending = True
+            if not self.is_converted(chunk):
+                self.changed = True
+                chunk = chunk.replace(cr + lf, lf).replace(cr, lf)
+                if self.newline != lf:
+                    chunk = chunk.replace(lf, self.newline)
+            yield chunk
+        if pending:
+            self.changed = self.changed or self.newline != cr
+            yield self.newline
+
+
+def _byte_chunks(data, start, chunk_size):
+    """Yield slices of the data in chunks."""
+
+    for pos in range(start, len(data), chunk_size):
+        yield data[pos:pos + chunk_size]
+
+
+def _decoded_chunks(data, start, chunk_size, decoder):
+    """Yield the decoded chunks of the data."""
+
+    for chunk in _byte_chunks(data, start, chunk_size):
+        yield decoder.decode(chunk)
+    yield decoder.decode(b'', True)
+
+
+def _convert(data, out, kind, encoding, chunk_size):
+    """Write the converted data to `out` returning whether anything changed."""
+
+    if is_ascii_compatible(encoding.codec):
+        # Line endings are plain bytes, no decoding needed.
+        converter = EndingConverter(NEWLINES[kind].encode('ascii'), b'\r', b'\n')
+        for chunk in converter.convert(_byte_chunks(data, 0, chunk_size)):
+            out.write(chunk)
+        return converter.changed
+
+    start = decode_start(data, encoding)
+    out.write(data[:start])
+    decoder = codecs.getincrementaldecoder(encoding.codec)()
+    encoder = codecs.getincrementalencoder(encoding.codec)()
+    converter = EndingConverter(NEWLINES[kind])
+    for chunk in converter.convert(_decoded_chunks(data, start, chunk_size, decoder)):
+        out.write(encoder.encode(chunk))
+    out.write(encoder.encode('', True))
+    return converter.changed
+
+
+def convert_file(file_name, kind, encoding=UTF8, chunk_size=CHUNK_SIZE):
+    """
+    Convert every line ending of a file on disk to `kind`.
+
+    The file is replaced atomically and only if something changed.
+    Returns whether the file was changed.
+    """
+
+    folder = os.path.dirname(os.path.abspath(file_name))
+    fd, temp = tempfile.mkstemp(prefix='.rle_', dir=folder)
+    try:
+        with os.fdopen(fd, 'wb') as out, map_file(file_name) as data:
+            changed = _convert(data, out, kind, encoding, chunk_size)
+        if changed:
+            shutil.copymode(file_name, temp)
+            os.replace(temp, file_name)
+        return changed
+    finally:
+        if os.path.exists(temp):
+            os.remove(temp)
+
+
+def dense_runs(endings):
+    """Check if the runs of the ending map are too short to be handled one at a time."""
+
+    return len(endings.kinds) * DENSE_RUNS > len(endings)
+
+
+def restore_endings(text, endings):
+    """
+    Give normalized text the line endings of the ending map.
+
+    Uniform endings are restored with a single `str.replace`; mixed endings with one slice per run,
+    unless the runs are so short that joining the rows is cheaper.
+    """
+
+    kind = endings.uniform if len(endings) else LF
+    if kind is not None:
+        return text if kind == LF else text.replace('\n', NEWLINES[kind])
+
+    if dense_runs(endings):
+        # Runs are too short for slicing to pay off, so split once and interleave the endings.
+        lines = text.split('\n')
+        newlines = [NEWLINES[kind] for _, kind in endings.iter_rows()]
+        newlines.append('')
+        return ''.join(chain.from_iterable(zip(lines, newlines)))
+
+    width = len(text) // (len(endings) + 1)
+    parts = []
+    pos = 0
+    find = text.find
+    for start, count, kind in endings.runs():
+        end = find('\n', pos) + 1 if count == 1 else skip_rows(text, pos, count, width)
+        parts.append(text[pos:end] if kind == LF else text[pos:end].replace('\n', NEWLINES[kind]))
+        pos = end
+    # The last row never has an ending of its own.
+    parts.append(text[pos:])
+    return ''.join(parts)
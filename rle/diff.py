@@ -0,0 +1,65 @@
+"""
+Text difference.
+
+Find the span of rows that changed between two versions of a text, so a view
+showing the old text can be updated by replacing just that span.  Common
+prefixes and suffixes are found by bisecting with slice comparisons, which run
+at C speed, instead of comparing character by character in Python.
+
+Licensed under MIT
+Copyright (c) 2013 - 2016 Isaac Muse <isaacmuse@gmail.com>
+"""
+
+
+def common_prefix(a, b):
+    """Return the length of the common prefix of two strings."""
+
+    lo = 0
+    hi = min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def common_suffix(a, b, limit):
+    """Return the length of the common suffix of two strings, at most `limit`."""
+
+    la = len(a)
+    lb = len(b)
+    lo = 0
+    hi = min(la, lb, limit)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[la - mid:la - lo] == b[lb - mid:lb - lo]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def changed_span(old, new):
+    """
+    Return `(start, old_end, new_end)` such that replacing `old[start:old_end]` with `new[start:new_end]` gives `new`.
+
+    The span is widened to whole rows.  Returns `None` if the texts are equal.
+    """
+
+    if old == new:
+        return None
+    prefix = common_prefix(old, new)
+    suffix = common_suffix(old, new, min(len(old), len(new)) - prefix)
+
+    # Widen to the start of the first changed row and the start of the row after the last.
+    start = old.rfind('\n', 0, prefix) + 1
+    old_end = len(old) - suffix
+    new_end = len(new) - suffix
+    if old_end and old[old_end - 1:old_end] != '\n':
+        index = old.find('\n', old_end)
+        shift = (index + 1 if index != -1 else len(old)) - old_end
+        old_end += shift
+        new_end += shift
+    return start, old_end, new_end
@@ -0,0 +1,107 @@
+"""
+Encoding resolution.
+
+Map Sublime Text encoding names to Python codecs.
+
+Licensed under MIT
+Copyright (c) 2013 - 2016 Isaac Muse <isaacmuse@gmail.com>
+"""
+import codecs
+import re
+from collections import namedtuple
+
+RE_PARENS = re.compile(r'.+\((.*)\)')
+
+WITH_BOM = ' with BOM'
+
+# Sublime encodings that have no text codec.
+UNDEFINED = ('Undefined', 'Hexadecimal', 'Hexidecimal')
+
+# Common Sublime encoding names and their codecs.
+# Anything else is derived from the name.
+SUBLIME_CODECS = {
+    'UTF-8': 'utf-8',
+    'UTF-16 LE': 'utf-16-le',
+    'UTF-16 BE': 'utf-16-be',
+    'Western (Windows 1252)': 'cp1252',
+    'Western (ISO 8859-1)': 'latin-1',
+    'Western (Mac Roman)': 'mac-roman',
+    'DOS (CP 437)': 'cp437',
+    'Central European (Windows 1250)': 'cp1250',
+    'Cyrillic (Windows 1251)': 'cp1251',
+    'Cyrillic (KOI8-R)': 'koi8-r',
+    'Greek (Windows 1253)': 'cp1253',
+    'Turkish (Windows 1254)': 'cp1254',
+    'Hebrew (Windows 1255)': 'cp1255',
+    'Arabic (Windows 1256)': 'cp1256',
+    'Baltic (Windows 1257)': 'cp1257',
+    'Vietnamese (Windows 1258)': 'cp1258',
+    'Japanese (Shift_JIS)': 'shift_jis',
+    'Chinese (GBK)': 'gbk',
+    'Korean (EUC-KR)': 'euc_kr'
+}
+
+# Byte order marks keyed by normalized codec name.
+BOMS = {
+    'utf-8': codecs.BOM_UTF8,
+    'utf-16-le': codecs.BOM_UTF16_LE,
+    'utf-16-be': codecs.BOM_UTF16_BE
+}
+
+Encoding = namedtuple('Encoding', ['codec', 'bom'])
+
+UTF8 = Encoding('utf-8', codecs.BOM_UTF8)
+
+_cache = {}
+
+
+def _resolve(name):
+    """Resolve a Sublime encoding name without the cache."""
+
+    with_bom = name.endswith(WITH_BOM)
+    if with_bom:
+        name = name[:-len(WITH_BOM)]
+    if name in UNDEFINED:
+        return UTF8
+
+    codec = SUBLIME_CODECS.get(name)
+    if codec is None:
+        m = RE_PARENS.match(name)
+        if m is not None:
+            name = m.group(1)
+        codec = name.replace('Windows', 'cp').replace('-', '_').replace(' ', '')
+
+    try:
+        codec = codecs.lookup(codec).name
+    except LookupError:
+        return UTF8
+    return Encoding(codec, BOMS.get(codec) if with_bom else None)
+
+
+def resolve(name):
+    """
+    Resolve a Sublime encoding name to an `Encoding` of `(codec, bom)`.
+
+    `bom` is the byte order mark the file starts with, if any.  Unknown and
+    undefined encodings resolve to UTF-8.
+    """
+
+    encoding = _cache.get(name)
+    if encoding is None:
+        encoding = _resolve(name)
+        _cache[name] = encoding
+    return encoding
+
+
+def candidates(name):
+    """Return the encodings to try, in order, when decoding a file Sublime reported as `name`."""
+
+    encoding = resolve(name)
+    return (encoding,) if encoding.codec == UTF8.codec else (encoding, UTF8)
+
+
+def decode_start(data, encoding):
+    """Return the offset decoding should start at, skipping the byte order mark if present."""
+
+    bom = encoding.bom
+    return len(bom) if bom and data[:len(bom)] == bom else 0
@@ -0,0 +1,300 @@
+"""
+Line ending map.
+
+Run-length encoded map of the line ending used by every row of a file.
+Real files are almost always one long run of a single ending, so a file
+of any size with uniform endings is described by a single run.
+
+Licensed under MIT
+Copyright (c) 2013 - 2016 Isaac Muse <isaacmuse@gmail.com>
+"""
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+
+LF = 0
+CR = 1
+CRLF = 2
+
+KIND_NAMES = ('lf', 'cr', 'crlf')
+NEWLINES = ('\n', '\r', '\r\n')
+
+
+class EndingStats(namedtuple('EndingStats', ['lf', 'cr', 'crlf', 'dominant', 'mixed_runs', 'first', 'last'])):
+    """
+    Line ending statistics.
+
+    `dominant` is the most common ending kind (`None` if there are no endings),
+    `mixed_runs` the number of runs of any other kind, and `first` and `last`
+    the first and last rows whose ending differs from the dominant one.
+    """
+
+    __slots__ = ()
+
+    @property
+    def mixed(self):
+        """Check if the endings are mixed."""
+
+        return self.mixed_runs > 0
+
+    def to_dict(self):
+        """Return the statistics as a JSON friendly dictionary."""
+
+        d = self._asdict()
+        d['dominant'] = KIND_NAMES[self.dominant] if self.dominant is not None else None
+        return d
+
+    def summary(self):
+        """Return a short human readable summary."""
+
+        if self.dominant is None:
+            return 'no line endings'
+        counts = ', '.join(
+            '%s %d' % (KIND_NAMES[kind].upper(), count)
+            for kind, count in ((LF, self.lf), (CRLF, self.crlf), (CR, self.cr)) if count
+        )
+        if not self.mixed:
+            return counts
+        return 'mixed (%s), %d %s from %s, rows %d-%d' % (
+            counts, self.mixed_runs, 'run differs' if self.mixed_runs == 1 else 'runs differ',
+            KIND_NAMES[self.dominant].upper(), self.first + 1, self.last + 1
+        )
+
+
+def _push(starts, counts, kinds, start, count, kind):
+    """Push a run onto the run arrays merging it with the previous run if possible."""
+
+    if kinds and kinds[-1] == kind:
+        counts[-1] += count
+    else:
+        starts.append(start)
+        counts.append(count)
+        kinds.append(kind)
+
+
+class EndingMap(object):
+    """
+    Run-length encoded line ending map.
+
+    Runs are stored as `(start, count, kind)` in three parallel arrays.
+    Adjacent runs never share the same kind, and the total rows of each kind are
+    kept up to date so the dominant kind is always known without a pass over the runs.
+    """
+
+    __slots__ = ('starts', 'counts', 'kinds', 'totals')
+
+    def __init__(self, runs=None):
+        """Initialize from an iterable of `(kind, count)` runs."""
+
+        self.starts = array('I')
+        self.counts = array('I')
+        self.kinds = array('B')
+        self.totals = [0, 0, 0]
+        if runs is not None:
+            for kind, count in runs:
+                self.append(kind, count)
+
+    def __len__(self):
+        """Return the number of rows that have a line ending."""
+
+        return self.starts[-1] + self.counts[-1] if self.starts else 0
+
+    def __eq__(self, other):
+        """Compare ending maps."""
+
+        if not isinstance(other, EndingMap):
+            return NotImplemented
+        return self.starts == other.starts and self.counts == other.counts and self.kinds == other.kinds
+
+    def __repr__(self):
+        """Representation."""
+
+        return 'EndingMap(%r)' % [(KIND_NAMES[k], c) for k, c in zip(self.kinds, self.counts)]
+
+    def to_bytes(self):
+        """Serialize the runs as a little endian run count followed by the run lengths and kinds."""
+
+        counts = array('I', self.counts)
+        if sys.byteorder == 'big':
+            counts.byteswap()
+        return struct.pack('<I', len(counts)) + counts.tobytes() + self.kinds.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Deserialize runs serialized by `to_bytes`, raising `ValueError` if the data is malformed."""
+
+        if len(data) < 4:
+            raise ValueError('Truncated ending map')
+        total = struct.unpack_from('<I', data)[0]
+        counts = array('I')
+        kinds = array('B')
+        end = 4 + total * counts.itemsize
+        if len(data) != end + total:
+            raise ValueError('Truncated ending map')
+        counts.frombytes(data[4:end])
+        kinds.frombytes(data[end:])
+        if sys.byteorder == 'big':
+            counts.byteswap()
+        if any(kind > CRLF for kind in kinds):
+            raise ValueError('Invalid line ending kind')
+        return cls(zip(kinds, counts))
+
+    @property
+    def uniform(self):
+        """Return the ending kind if every row shares it, otherwise `None`."""
+
+        return self.kinds[0] if len(self.kinds) == 1 else None
+
+    def append(self, kind, count=1):
+        """Append `count` rows of the given kind."""
+
+        if count:
+            _push(self.starts, self.counts, self.kinds, len(self), count, kind)
+            self.totals[kind] += count
+
+    def count(self, kind):
+        """Count rows of the given kind."""
+
+        return self.totals[kind]
+
+    @property
+    def dominant(self):
+        """Return the most common ending kind, or `None` if there are no endings."""
+
+        return max((LF, CRLF, CR), key=lambda k: self.totals[k]) if self.starts else None
+
+    def stats(self):
+        """Compute the line ending statistics from the runs."""
+
+        totals = self.totals
+        dominant = self.dominant
+
+        mixed_runs = 0
+        first = last = None
+        for start, count, kind in zip(self.starts, self.counts, self.kinds):
+            if kind != dominant:
+                mixed_runs += 1
+                if first is None:
+                    first = start
+                last = start + count - 1
+        return EndingStats(totals[LF], totals[CR], totals[CRLF], dominant, mixed_runs, first, last)
+
+    def kind_at(self, row):
+        """Return the ending kind of the row or `None` if the row has no ending."""
+
+        if row < 0 or row >= len(self):
+            return None
+        return self.kinds[bisect_right(self.starts, row) - 1]
+
+    def find_other(self, row, kind, forward=True):
+        """
+        Return the nearest row after (or before) `row` whose ending isn't `kind`, or `None`.
+
+        As neighboring runs never share a kind, the row is always in the run at `row`
+        or in the run next to it, so this costs a single bisect.
+        """
+
+        total = len(self)
+        if forward:
+            row = max(row, -1)
+            if row + 1 >= total:
+                return None
+            index = bisect_right(self.starts, row + 1) - 1
+            if self.kinds[index] != kind:
+                return row + 1
+            index += 1
+            return self.starts[index] if index < len(self.starts) else None
+
+        row = min(row, total)
+        if row <= 0:
+            return None
+        index = bisect_right(self.starts, row - 1) - 1
+        if self.kinds[index] != kind:
+            return row - 1
+        return self.starts[index] - 1 if index else None
+
+    def runs(self, start=0, end=None):
+        """Yield `(start, count, kind)` for the runs overlapping `[start, end)` clipped to the range."""
+
+        total = len(self)
+        end = total if end is None else min(end, total)
+        start = max(start, 0)
+        if start >= end:
+            return
+        index = bisect_right(self.starts, start) - 1
+        while index < len(self.starts):
+            run_start = self.starts[index]
+            if run_start >= end:
+                break
+            first = max(run_start, start)
+            last = min(run_start + self.counts[index], end)
+            yield first, last - first, self.kinds[index]
+            index += 1
+
+    def iter_rows(self, start=0, end=None):
+        """Yield `(row, kind)` for every row in `[start, end)`."""
+
+        for run_start, count, kind in self.runs(start, end):
+            for row in range(run_start, run_start + count):
+                yield row, kind
+
+    def rows(self, kind):
+        """Return the rows of the given kind as an `array('I')`."""
+
+        rows = array('I')
+        for start, count, k in zip(self.starts, self.counts, self.kinds):
+            if k == kind:
+                rows.extend(range(start, start + count))
+        return rows
+
+    def set_kind(self, row, kind):
+        """Set the ending kind of a single row."""
+
+        self.set_range(row, row + 1, kind)
+
+    def set_range(self, start, end, kind):
+        """Set the ending kind of every row in `[start, end)` splitting runs as needed."""
+
+        end = min(end, len(self))
+        start = max(start, 0)
+        if start >= end:
+            return
+
+        first = bisect_right(self.starts, start) - 1
+        last = bisect_right(self.starts, end - 1) - 1
+        if first == last and self.kinds[first] == kind:
+            return
+
+        # Build the replacement for the affected runs: the untouched head of the
+        # first run, the new run, and the untouched tail of the last run.
+        starts = array('I')
+        counts = array('I')
+        kinds = array('B')
+        head = start - self.starts[first]
+        if head:
+            _push(starts, counts, kinds, self.starts[first], head, self.kinds[first])
+        _push(starts, counts, kinds, start, end - start, kind)
+        tail = self.starts[last] + self.counts[last] - end
+        if tail:
+            _push(starts, counts, kinds, end, tail, self.kinds[last])
+
+        # Merge with the neighboring runs when they share a kind.
+        lo = first
+        hi = last + 1
+        if lo > 0 and self.kinds[lo - 1] == kinds[0]:
+            lo -= 1
+            starts[0] = self.starts[lo]
+            counts[0] += self.counts[lo]
+        if hi < len(self.starts) and self.kinds[hi] == kinds[-1]:
+            counts[-1] += self.counts[hi]
+            hi += 1
+
+        for count, k in zip(self.counts[lo:hi], self.kinds[lo:hi]):
+            self.totals[k] -= count
+        for count, k in zip(counts, kinds):
+            self.totals[k] += count
+        self.starts[lo:hi] = starts
+        self.counts[lo:hi] = counts
+        self.kinds[lo:hi] = kinds
@@ -0,0 +1,218 @@
+"""
+Profiling.
+
+Time the phases of an operation and count the API calls it makes, then report
+them as one record on the console or as a line of a JSON lines log.  Phases may
+run on different threads; the total is the wall time from the start of the
+operation to its end, and only the calls of the thread running a phase are counted
+towards it.  Optionally, the phases are also run under `cProfile`.
+
+Licensed under MIT
+Copyright (c) 2013 - 2016 Isaac Muse <isaacmuse@gmail.com>
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import types
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+# Number of functions printed from a `cProfile` capture.
+CPROFILE_TOP = 25
+
+
+class ApiCounter(object):
+    """
+    Count calls of the public methods of some classes made by the threads that enabled it.
+
+    The methods are wrapped when the first thread enables the counter and restored once
+    every thread has disabled it as many times, so overlapping phases share the wrappers.
+    Calls from other threads pass straight through, uncounted.
+    """
+
+    def __init__(self, classes):
+        """Initialize with `(prefix, class)` pairs; calls are counted as `prefix.method`."""
+
+        self.classes = classes
+        self.lock = threading.Lock()
+        self.active = {}
+        self.depth = Counter()
+        self.saved = []
+
+    def wrap(self, name, func):
+        """Wrap a function to count its calls under `name` when made by an enabled thread."""
+
+        active = self.active
+
+        def call(*args, **kwargs):
+            """Count the call."""
+
+            counts = active.get(threading.get_ident())
+            if counts is not None:
+                counts[name] += 1
+            return func(*args, **kwargs)
+
+        call.__name__ = func.__name__
+        call.__doc__ = func.__doc__
+        return call
+
+    def enable(self):
+        """Start counting the calls of the current thread and return its `Counter` of calls."""
+
+        ident = threading.get_ident()
+        with self.lock:
+            self.depth[ident] += 1
+            if ident not in self.active:
+                self.active[ident] = Counter()
+            if not self.saved:
+                for prefix, cls in self.classes:
+                    for name, attr in list(vars(cls).items()):
+                        if not name.startswith('_') and isinstance(attr, types.FunctionType):
+                            self.saved.append((cls, name, attr))
+                            setattr(cls, name, self.wrap('%s.%s' % (prefix, name), attr))
+            return self.active[ident]
+
+    def disable(self):
+        """Stop counting the calls of the current thread."""
+
+        ident = threading.get_ident()
+        with self.lock:
+            self.depth[ident] -= 1
+            if self.depth[ident] > 0:
+                return
+            del self.depth[ident]
+            self.active.pop(ident, None)
+            if self.active:
+                return
+            for cls, name, attr in self.saved:
+                setattr(cls, name, attr)
+            self.saved = []
+
+
+class NullProfiler(object):
+    """Profiler that records nothing, used when profiling is disabled."""
+
+    def __enter__(self):
+        """Enter a phase."""
+
+        return self
+
+    def __exit__(self, *args):
+        """Leave a phase."""
+
+    def phase(self, name):
+        """Time nothing."""
+
+        return self
+
+    def count(self, **counts):
+        """Record nothing."""
+
+    def finish(self):
+        """Report nothing."""
+
+        return None
+
+
+class Profiler(object):
+    """Time the phases of one operation and report them when it finishes."""
+
+    def __init__(self, operation, api=None, log=None, cprofile=False):
+        """
+        Initialize.
+
+        `api` is an optional `ApiCounter`.  Records are appended to the `log` file,
+        or printed if there is none.
+        """
+
+        self.operation = operation
+        self.api = api
+        self.log = log
+        self.phases = OrderedDict()
+        self.counts = OrderedDict()
+        self.calls = Counter()
+        self.profile = cProfile.Profile() if cprofile else None
+        self.started = time.time()
+        self.start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        """Time a phase; repeated phases add up."""
+
+        profiling = False
+        if self.profile is not None:
+            try:
+                self.profile.enable()
+                profiling = True
+            except ValueError:
+                # Another profiler is already active.
+                pass
+        if self.api is not None:
+            calls = self.api.enable()
+            before = calls.copy()
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            elapsed = time.perf_counter() - start
+            if self.api is not None:
+                self.calls.update(calls - before)
+                self.api.disable()
+            if profiling:
+                self.profile.disable()
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def count(self, **counts):
+        """Record counts, such as lines and bytes, of the operation."""
+
+        self.counts.update(counts)
+
+    def record(self):
+        """Get the record of the operation."""
+
+        return OrderedDict(
+            [
+                ('operation', self.operation),
+                ('time', self.started),
+                ('total', time.perf_counter() - self.start),
+                ('phases', self.phases),
+                ('counts', self.counts),
+                ('api_calls', OrderedDict(sorted(self.calls.items()))),
+            ]
+        )
+
+    def finish(self):
+        """Report the operation and return its record."""
+
+        record = self.record()
+        if self.log:
+            with open(self.log, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+        else:
+            print('RawLineEdit: profile: %s' % format_record(record))
+
+        if self.profile is not None:
+            if self.log:
+                self.profile.dump_stats(
+                    '%s.%s.%d.prof' % (os.path.splitext(self.log)[0], self.operation, int(self.started * 1000))
+                )
+            else:
+                out = io.StringIO()
+                pstats.Stats(self.profile, stream=out).sort_stats('cumulative').print_stats(CPROFILE_TOP)
+                print(out.getvalue())
+        return record
+
+
+def format_record(record):
+    """Format a record as one line."""
+
+    parts = ['%s %.3fs' % (record['operation'], record['total'])]
+    if record['phases']:
+        parts.append('(%s)' % ', '.join('%s %.3fs' % item for item in record['phases'].items()))
+    parts.extend('%s=%s' % item for item in record['counts'].items())
+    parts.append('api_calls=%d' % sum(record['api_calls'].values()))
+    return ' '.join(parts)
@@ -0,0 +1,310 @@
+"""
+Line ending scanner.
+
+Locate line endings in bulk with `str.count` and `str.find` instead of calling
+back into Python once per line.  Only the rarest ending in a file is ever visited
+from Python, everything between them is counted at C speed.
+
+Licensed under MIT
+Copyright (c) 2013 - 2016 Isaac Muse <isaacmuse@gmail.com>
+"""
+import codecs
+import mmap
+import os
+from array import array
+from contextlib import contextmanager
+from itertools import accumulate, chain, repeat
+from operator import add
+from .endings import EndingMap, LF, CR, CRLF
+
+# Size in bytes of the chunks files are read in.
+CHUNK_SIZE = 1024 * 1024
+
+# Size in bytes of the windows a memory mapped file is scanned in.
+MAP_WINDOW = 16 * 1024 * 1024
+
+# Codecs where carriage returns and newlines can't be found by searching the raw bytes.
+BYTE_UNSAFE_CODECS = ('utf_16', 'utf_32', 'utf_7', 'hz', 'iso2022')
+
+
+def _two_kind_runs(text, rare, rare_kind, common, common_kind):
+    """Yield runs for text whose endings are all one of two single characters."""
+
+    last = 0
+    pos = text.find(rare)
+    while pos != -1:
+        count = text.count(common, last, pos)
+        if count:
+            yield common_kind, count
+        yield rare_kind, 1
+        last = pos + 1
+        pos = text.find(rare, last)
+    count = text.count(common, last)
+    if count:
+        yield common_kind, count
+
+
+def _mixed_runs(text, cr, lf):
+    """Yield runs for text that contains all three ending types."""
+
+    last = 0
+    pos = text.find(cr)
+    while pos != -1:
+        count = text.count(lf, last, pos)
+        if count:
+            yield LF, count
+        if text.startswith(lf, pos + 1):
+            yield CRLF, 1
+            last = pos + 2
+        else:
+            yield CR, 1
+            last = pos + 1
+        pos = text.find(cr, last)
+    count = text.count(lf, last)
+    if count:
+        yield LF, count
+
+
+def ending_runs(text, cr='\r', lf='\n'):
+    """
+    Return an iterator of `(kind, count)` runs describing the line endings in order.
+
+    Works on `str` or, given byte literals for `cr` and `lf`, on ASCII compatible
+    `bytes`.  Runs of the same kind may be yielded back to back.
+    """
+
+    crlf = cr + lf
+    n_crlf = text.count(crlf)
+    n_cr = text.count(cr) - n_crlf
+    n_lf = text.count(lf) - n_crlf
+
+    # Uniform endings need no scanning at all.
+    if not n_cr and not n_crlf:
+        return iter([(LF, n_lf)] if n_lf else [])
+    if not n_lf and not n_cr:
+        return iter([(CRLF, n_crlf)])
+    if not n_lf and not n_crlf:
+        return iter([(CR, n_cr)])
+
+    if not n_cr:
+        # Collapse CRLF to CR so every ending is a single character.
+        single = text.replace(crlf, cr)
+        if n_crlf <= n_lf:
+            return _two_kind_runs(single, cr, CRLF, lf, LF)
+        return _two_kind_runs(single, lf, LF, cr, CRLF)
+    if not n_crlf:
+        if n_cr <= n_lf:
+            return _two_kind_runs(text, cr, CR, lf, LF)
+        return _two_kind_runs(text, lf, LF, cr, CR)
+    if not n_lf:
+        # Collapse CRLF to LF so every ending is a single character.
+        single = text.replace(crlf, lf)
+        if n_crlf <= n_cr:
+            return _two_kind_runs(single, lf, CRLF, cr, CR)
+        return _two_kind_runs(single, cr, CR, lf, CRLF)
+    return _mixed_runs(text, cr, lf)
+
+
+def split_endings(text):
+    """
+    Split the line endings out of the text.
+
+    Return the text with every line ending normalized to a newline and an iterator of
+    `(kind, count)` runs describing the original endings.
+    """
+
+    runs = ending_runs(text)
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text, runs
+
+
+def row_offsets(text, offsets=None, base=0, chunk_size=CHUNK_SIZE):
+    """
+    Append the offset just past every newline of normalized text, shifted by `base`, to an `array('Q')`.
+
+    Entry `r` is where row `r + 1` starts.  Offsets are summed from the lengths of the rows,
+    so no Python code runs per row.  The rows are split in slices of about `chunk_size`
+    characters, so only one slice's rows exist as strings at a time.  Return the array.
+    """
+
+    if offsets is None:
+        offsets = array('Q')
+    size = len(text)
+    start = 0
+    while start < size:
+        # End each slice just past a newline.
+        end = text.rfind('\n', start, start + chunk_size) + 1
+        if end <= start:
+            end = text.find('\n', start + chunk_size) + 1
+            if not end:
+                break
+        rows = text[start:end].split('\n')
+        rows.pop()
+        points = accumulate(chain((base + start,), map(add, map(len, rows), repeat(1))))
+        # Skip the start of the slice itself.
+        next(points)
+        offsets.extend(points)
+        start = end
+    return offsets
+
+
+def scan_text(text):
+    """Return the text with endings normalized to newlines and its `EndingMap`."""
+
+    text, runs = split_endings(text)
+    return text, EndingMap(runs)
+
+
+def process_lines(text):
+    """
+    Count line ending types and return buffer with only new lines.
+
+    Returns `(text, lf, cr, crlf)` where each ending list is an `array('I')` of row indexes.
+    """
+
+    text, endings = scan_text(text)
+    return text, endings.rows(LF), endings.rows(CR), endings.rows(CRLF)
+
+
+@contextmanager
+def map_file(file_name):
+    """Memory map a file read only (empty files, which can't be mapped, give empty bytes)."""
+
+    with open(file_name, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            yield b''
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                yield mm
+
+
+class StreamScanner(object):
+    """
+    Scan line endings of text that arrives in chunks.
+
+    A carriage return at the end of a chunk is held back until the next chunk is
+    seen, so a CRLF split across chunks is still recognized as a single ending.
+    If the `EndingMap` of the text is already known, endings are only normalized.
+    With `offsets`, the `row_offsets` of the normalized text accumulate in `self.offsets`.
+    """
+
+    def __init__(self, endings=None, offsets=False):
+        """Initialize."""
+
+        self.scan = endings is None
+        self.endings = EndingMap() if endings is None else endings
+        self.offsets = array('Q') if offsets else None
+        self.length = 0
+        self.pending_cr = False
+
+    def feed(self, text, final=False):
+        """Scan a chunk of text and return it with endings normalized."""
+
+        if self.pending_cr:
+            text = '\r' + text
+            self.pending_cr = False
+        if not final and text.endswith('\r'):
+            text = text[:-1]
+            self.pending_cr = True
+        if not self.scan:
+            if '\r' in text:
+                text = text.replace('\r\n', '\n').replace('\r', '\n')
+        else:
+            text, runs = split_endings(text)
+            for kind, count in runs:
+                self.endings.append(kind, count)
+        if self.offsets is not None:
+            row_offsets(text, self.offsets, self.length)
+            self.length += len(text)
+        return text
+
+    def scan_buffer(self, data, encoding, start=0, chunk_size=CHUNK_SIZE, progress=None):
+        """
+        Decode `bytes` or a memory map from `start` in chunks yielding the normalized text.
+
+        Only one chunk is held at a time; the endings accumulate in `self.endings`.
+        If given, `progress` is called with the bytes decoded so far and the total size.
+        """
+
+        decoder = codecs.getincrementaldecoder(encoding)()
+        size = len(data)
+        while True:
+            chunk = data[start:start + chunk_size]
+            start += len(chunk)
+            final = start >= size
+            if progress is not None:
+                progress(start, size)
+            text = self.feed(decoder.decode(chunk, final), final)
+            if text:
+                yield text
+            if final:
+                break
+
+    def scan_file(self, file_name, encoding, chunk_size=CHUNK_SIZE, progress=None):
+        """Map a file and decode it in chunks yielding the normalized text."""
+
+        with map_file(file_name) as data:
+            for text in self.scan_buffer(data, encoding, 0, chunk_size, progress):
+                yield text
+
+
+def scan_file(file_name, encoding, chunk_size=CHUNK_SIZE):
+    """Return the normalized text of a file and its `EndingMap`."""
+
+    scanner = StreamScanner()
+    text = ''.join(scanner.scan_file(file_name, encoding, chunk_size))
+    return text, scanner.endings
+
+
+def is_ascii_compatible(encoding):
+    """Check if line endings of the encoding can be found by searching the raw bytes."""
+
+    try:
+        name = codecs.lookup(encoding).name.replace('-', '_')
+        return not name.startswith(BYTE_UNSAFE_CODECS) and '\r\n'.encode(encoding).endswith(b'\r\n')
+    except LookupError:
+        return False
+
+
+def scan_bytes(data, window=MAP_WINDOW):
+    """
+    Build the `EndingMap` of ASCII compatible bytes, such as a memory mapped file.
+
+    The bytes are searched in windows of `window` bytes so only one window is ever copied at a time.
+    """
+
+    endings = EndingMap()
+    size = len(data)
+    start = 0
+    while start < size:
+        end = min(start + window, size)
+        # Keep a CRLF pair within a single window.
+        if end < size and data[end - 1] == 0x0D and data[end] == 0x0A:
+            end += 1
+        for kind, count in ending_runs(data[start:end], b'\r', b'\n'):
+            endings.append(kind, count)
+        start = end
+    return endings
+
+
+def scan_mapped(file_name, window=MAP_WINDOW):
+    """
+    Build the `EndingMap` of a file by searching its memory mapped bytes.
+
+    The file is never decoded, so this is only valid for ASCII compatible encodings.
+    """
+
+    with map_file(file_name) as mm:
+        return scan_bytes(mm, window)
+
+
+def scan_file_endings(file_name, encoding, chunk_size=CHUNK_SIZE):
+    """Return the `EndingMap` of a file, only decoding it if the encoding requires it."""
+
+    if is_ascii_compatible(encoding):
+        return scan_mapped(file_name)
+    scanner = StreamScanner()
+    for _ in scanner.scan_file(file_name, encoding, chunk_size):
+        pass
+    return scanner.endings
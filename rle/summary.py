@@ -0,0 +1,198 @@
+"""
+Line ending summary.
+
+Extract only the rows whose line ending differs from the dominant one, with a
+few rows of context, so a huge file can be inspected without rendering all of it.
+Rows are located with `count` and `rfind`, on text or on the raw bytes of a file,
+so skipping the rows between anomalies costs no Python work per row.
+
+Licensed under MIT
+Copyright (c) 2013 - 2016 Isaac Muse <isaacmuse@gmail.com>
+"""
+from array import array
+from .endings import EndingMap
+
+# Below this many rows, skip rows one newline at a time.
+SKIP_LINEAR = 32
+
+# Size in bytes of the slices of a memory mapped file that rows are counted in.
+SKIP_WINDOW = 1024 * 1024
+
+# Line endings of each kind as bytes.
+NEWLINE_BYTES = (b'\n', b'\r', b'\r\n')
+
+
+def anomaly_windows(endings, context=2, dominant=None):
+    """
+    Return the merged `(start, end)` row ranges around rows whose ending differs from the dominant one.
+
+    The ranges include `context` rows on either side and may include the final row, which has no ending.
+    """
+
+    if dominant is None:
+        dominant = endings.stats().dominant
+    last_row = len(endings) + 1
+    windows = []
+    for start, count, kind in endings.runs():
+        if kind == dominant:
+            continue
+        lo = max(start - context, 0)
+        hi = min(start + count + context, last_row)
+        if windows and lo <= windows[-1][1]:
+            windows[-1] = (windows[-1][0], hi)
+        else:
+            windows.append((lo, hi))
+    return windows
+
+
+def skip_rows(text, pos, count, width=80, newline='\n'):
+    """
+    Return the offset of the row `count` rows after the row starting at `pos`.
+
+    `width` is an estimate of the average row length used to size the search steps.
+    Rows end with `newline`, which may also be given as bytes to search `bytes`.
+    """
+
+    size = len(text)
+    step = len(newline)
+    width = max(width, 1)
+    while count > SKIP_LINEAR:
+        # Aim at half of the remaining rows so a good estimate never overshoots.
+        end = min(pos + (count // 2) * width, size)
+        found = text.count(newline, pos, end)
+        if found > count:
+            width = max(width // 2, 1)
+            continue
+        if found:
+            pos = text.rfind(newline, pos, end) + step
+            count -= found
+        elif end == size:
+            return size
+        else:
+            width *= 2
+    while count:
+        index = text.find(newline, pos)
+        if index == -1:
+            return size
+        pos = index + step
+        count -= 1
+    return pos
+
+
+def skip_mapped_rows(data, pos, count, newline, width=80):
+    """
+    Return the offset of the row `count` rows after the row starting at `pos` in memory mapped bytes.
+
+    All of the rows must end with `newline`.  Rows are counted in slices sized from `width`,
+    the estimated average row length, and at most `SKIP_WINDOW` bytes so only one slice is
+    ever copied out of the map at a time.
+    """
+
+    size = len(data)
+    width = max(width, 1)
+    while count:
+        chunk = data[pos:pos + min((count + SKIP_LINEAR) * width, SKIP_WINDOW)]
+        if not chunk:
+            return size
+        found = chunk.count(newline)
+        if found >= count:
+            return pos + skip_rows(chunk, 0, count, len(chunk) // found, newline)
+        count -= found
+        step = len(chunk)
+        if len(newline) > 1 and step > 1 and pos + step < size and chunk.endswith(newline[:1]):
+            # Keep a CRLF pair within a single slice.
+            step -= 1
+        pos += step
+        if found:
+            width = max(width, step // found)
+        else:
+            width *= 2
+    return pos
+
+
+def format_windows(endings, windows, texts):
+    """
+    Format the rows of each window with their line numbers.
+
+    `texts` yields the normalized text of each window's rows.  Returns the summary text,
+    the `EndingMap` of the summary rows and an `array('I')` of their original row indexes.
+    """
+
+    rows = array('I')
+    sparse = EndingMap()
+    if not windows:
+        return '', sparse, rows
+
+    digits = len(str(windows[-1][1]))
+    parts = []
+    for (start, end), text in zip(windows, texts):
+        for number, line in enumerate(text.split('\n'), start + 1):
+            if number > end:
+                break
+            parts.append('%*d  %s' % (digits, number, line))
+        rows.extend(range(start, end))
+        for _, count, kind in endings.runs(start, end):
+            sparse.append(kind, count)
+    text = '\n'.join(parts)
+    if len(sparse) == len(parts):
+        # The last summary row has an ending of its own.
+        text += '\n'
+    return text, sparse, rows
+
+
+def summarize(text, endings, context=2):
+    """
+    Summarize normalized text to the rows around line ending anomalies.
+
+    Returns the summary text, with each row prefixed by its original line number,
+    the `EndingMap` of the summary rows, and an `array('I')` of their original row indexes.
+    """
+
+    windows = anomaly_windows(endings, context)
+    width = len(text) // (len(endings) + 1) or 1
+
+    def texts():
+        """Yield the text of each window."""
+
+        row = pos = 0
+        for start, end in windows:
+            pos = skip_rows(text, pos, start - row, width)
+            stop = skip_rows(text, pos, end - start, width)
+            yield text[pos:stop]
+            row = end
+            pos = stop
+
+    return format_windows(endings, windows, texts())
+
+
+def summarize_mapped(data, endings, codec, start=0, context=2):
+    """
+    Summarize the memory mapped bytes of a file to the rows around line ending anomalies.
+
+    Only the bytes of the summary rows are decoded, so this is only valid for ASCII compatible
+    encodings.  `start` is the offset of the first row, after any byte order mark.
+    Returns the same as `summarize`, and raises `UnicodeDecodeError` if a summary row doesn't decode.
+    """
+
+    windows = anomaly_windows(endings, context)
+    width = (len(data) - start) // (len(endings) + 1) or 1
+
+    def skip(pos, row, end):
+        """Skip the rows in `[row, end)` starting at `pos`."""
+
+        for _, count, kind in endings.runs(row, end):
+            pos = skip_mapped_rows(data, pos, count, NEWLINE_BYTES[kind], width)
+        # The final row has no ending and runs to the end of the file.
+        return len(data) if end > len(endings) else pos
+
+    def texts():
+        """Yield the decoded and normalized text of each window."""
+
+        row, pos = 0, start
+        for lo, hi in windows:
+            pos = skip(pos, row, lo)
+            stop = skip(pos, lo, hi)
+            yield data[pos:stop].decode(codec).replace('\r\n', '\n').replace('\r', '\n')
+            row, pos = hi, stop
+
+    return format_windows(endings, windows, texts())
@@ -5,7 +5,7 @@ import textwrap
 import webbrowser
 import re
 
-__version__ = "2.1.0"
+__version__ = "2.2.0"
 __pc_name__ = 'RawLineEdit'
 
 CSS = '''
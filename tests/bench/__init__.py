@@ -0,0 +1 @@
+"""Benchmarks of the plugin's hot paths run against stand-in Sublime modules."""
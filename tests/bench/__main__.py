@@ -0,0 +1,5 @@
+"""Run the benchmarks."""
+import sys
+from .bench import main
+
+sys.exit(main())
@@ -0,0 +1,261 @@
+"""
+Benchmarks of the scanning, stripping and rendering hot paths.
+
+Every benchmark runs against synthetic text of a given size and line ending pattern
+and reports its time, peak memory and the number of Sublime API calls it made.
+Results are compared against the stored baselines to catch regressions.
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import OrderedDict
+from . import fake
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+
+SIZES = OrderedDict(
+    [
+        ('1KB', 1024),
+        ('64KB', 64 * 1024),
+        ('1MB', 1024 * 1024),
+        ('16MB', 16 * 1024 * 1024),
+        ('256MB', 256 * 1024 * 1024),
+        ('1GB', 1024 * 1024 * 1024)
+    ]
+)
+
+PATTERNS = ('lf', 'crlf', 'mixed', 'pathological')
+
+# Number of carets spread over the file for the insert benchmark.
+CARETS = 100
+
+# Timings under this many seconds are too noisy to compare.
+MIN_SECONDS = 0.005
+
+# Peak memory differences under this many bytes are ignored.
+MIN_PEAK = 64 * 1024
+
+# Counters of created objects rather than API calls.
+OBJECT_COUNTS = ('phantoms', 'regions', 'inserted')
+
+
+def ending(pattern, index):
+    """Return the line ending of a line for the pattern."""
+
+    if pattern == 'lf':
+        return '\n'
+    if pattern == 'crlf':
+        return '\r\n'
+    if pattern == 'mixed':
+        return '\r\n' if index % 7 == 0 else '\r' if index % 13 == 0 else '\n'
+    # A stray carriage return before every CRLF.
+    return '\r\r\n'
+
+
+def synthetic(size, pattern):
+    """Return synthetic text of `size` characters with the line ending pattern."""
+
+    block = ''.join(
+        'The quick brown fox jumps over the lazy dog %04d%s' % (index, ending(pattern, index))
+        for index in range(1024)
+    )
+    return (block * (size // len(block) + 1))[:size]
+
+
+class Benchmark(object):
+    """A benchmark: `setup` builds the state from the text outside of the measurement, `run` is measured."""
+
+    def __init__(self, name, setup, run):
+        """Initialize."""
+
+        self.name = name
+        self.setup = setup
+        self.run = run
+
+
+def benchmarks(plugin):
+    """Return the benchmarks of the loaded plugin module."""
+
+    scan = sys.modules[fake.PACKAGE + '.rle.scan']
+
+    def raw_view(text):
+        """Return a raw line view of the text, its ending map and its row offsets."""
+
+        text, endings = scan.scan_text(text)
+        view = fake.View(text)
+        view.line_starts()
+        return view, endings, scan.row_offsets(text)
+
+    def strip_setup(text):
+        """Prepare a raw line view with its ending map."""
+
+        view, endings, _ = raw_view(text)
+        plugin.get_view_state(view).endings = endings
+        return view
+
+    def phantoms_setup(text):
+        """Prepare a raw line view that has no phantoms yet."""
+
+        return raw_view(text)
+
+    def read_buffer_setup(text):
+        """Prepare an unsaved buffer as Sublime holds it, with normalized line endings."""
+
+        view = raw_view(text)[0]
+        view.set_line_endings('Windows')
+        return plugin.ToggleRawLineEditCommand(view)
+
+    def insert_setup(text):
+        """Prepare a rendered raw line view with carets spread over it."""
+
+        view, endings, offsets = raw_view(text)
+        plugin.update_phantoms(view, endings, offsets)
+        rows = len(view.line_starts())
+        step = max(rows // CARETS, 1)
+        for row in range(0, rows, step):
+            pt = view.text_point(row, 0)
+            view.sel().add(fake.Region(pt))
+        return plugin.RawLineInsertCommand(view)
+
+    return [
+        Benchmark('process_lines', lambda text: text, scan.process_lines),
+        Benchmark('strip_buffer_glyphs', strip_setup, plugin.strip_buffer_glyphs),
+        Benchmark('update_phantoms', phantoms_setup, lambda state: plugin.update_phantoms(*state)),
+        Benchmark('read_buffer', read_buffer_setup, lambda command: command.read_buffer()),
+        Benchmark('RawLineInsertCommand', insert_setup, lambda command: command.run(None, style='Windows'))
+    ]
+
+
+def measure(plugin, bench, text, repeat=3):
+    """Measure the best time, peak memory and API calls of a benchmark on the text."""
+
+    seconds = None
+    calls = None
+    for _ in range(repeat):
+        state = bench.setup(text)
+        gc.collect()
+        fake.reset()
+        start = time.perf_counter()
+        bench.run(state)
+        elapsed = time.perf_counter() - start
+        calls = dict(fake.CALLS)
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+        del state
+        plugin.VIEWS.clear()
+
+    state = bench.setup(text)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        bench.run(state)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    del state
+    plugin.VIEWS.clear()
+    return {'seconds': seconds, 'peak': peak, 'calls': calls}
+
+
+def compare(result, baseline, tolerance=1.5):
+    """Return the regressions of a result against its baseline as a list of messages."""
+
+    regressions = []
+    for name, count in sorted(result['calls'].items()):
+        expected = baseline['calls'].get(name, 0)
+        if count > expected:
+            regressions.append('%s calls %d > %d' % (name, count, expected))
+    if result['peak'] > baseline['peak'] * tolerance + MIN_PEAK:
+        regressions.append('peak memory %d > %d' % (result['peak'], baseline['peak']))
+    if result['seconds'] > baseline['seconds'] * tolerance + MIN_SECONDS:
+        regressions.append('time %.4fs > %.4fs' % (result['seconds'], baseline['seconds']))
+    return regressions
+
+
+def load_baselines(path=BASELINES):
+    """Load the stored baselines."""
+
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_baselines(baselines, path=BASELINES):
+    """Store the baselines."""
+
+    with open(path, 'w') as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def cases(max_size, only=None):
+    """Yield `(key, size, pattern, benchmark name)` of every case up to the size."""
+
+    for size_name, size in SIZES.items():
+        if size > max_size:
+            break
+        for pattern in PATTERNS:
+            for name in ('process_lines', 'strip_buffer_glyphs', 'update_phantoms', 'read_buffer',
+                         'RawLineInsertCommand'):
+                key = '%s/%s/%s' % (name, pattern, size_name)
+                if only is None or only in key:
+                    yield key, size, pattern, name
+
+
+def run_cases(max_size, only=None, repeat=3):
+    """Run the benchmarks yielding the key and result of every case."""
+
+    plugin = fake.load_plugin()
+    lookup = {bench.name: bench for bench in benchmarks(plugin)}
+    text = None
+    current = None
+    for key, size, pattern, name in cases(max_size, only):
+        if current != (size, pattern):
+            text = None
+            text = synthetic(size, pattern)
+            current = (size, pattern)
+        yield key, measure(plugin, lookup[name], text, repeat if size <= SIZES['16MB'] else 1)
+
+
+def parse_size(value):
+    """Parse a size name such as `16MB`."""
+
+    value = value.upper()
+    if value in SIZES:
+        return SIZES[value]
+    return int(value)
+
+
+def main(argv=None):
+    """Run the benchmarks and report regressions against the baselines."""
+
+    parser = argparse.ArgumentParser(prog='python -m tests.bench', description='Raw Line Edit benchmarks.')
+    parser.add_argument('--max-size', default='16MB', help='Largest input size to run (%s).' % ', '.join(SIZES))
+    parser.add_argument('--only', default=None, help='Only run cases containing this text.')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs to take the best time of.')
+    parser.add_argument('--tolerance', type=float, default=1.5, help='Allowed slow down before reporting.')
+    parser.add_argument('--save', action='store_true', help='Store the results as the new baselines.')
+    args = parser.parse_args(argv)
+
+    baselines = load_baselines()
+    failed = 0
+    for key, result in run_cases(parse_size(args.max_size), args.only, args.repeat):
+        baseline = baselines.get(key)
+        regressions = compare(result, baseline, args.tolerance) if baseline and not args.save else []
+        failed += bool(regressions)
+        print(
+            '%-48s %10.4fs %12d B %8d calls %s' % (
+                key, result['seconds'], result['peak'],
+                sum(count for name, count in result['calls'].items() if name not in OBJECT_COUNTS),
+                ('REGRESSION: ' + '; '.join(regressions)) if regressions else ''
+            )
+        )
+        if args.save:
+            baselines[key] = result
+    if args.save:
+        save_baselines(baselines)
+    return 1 if failed else 0
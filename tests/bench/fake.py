@@ -0,0 +1,745 @@
+"""
+Stand-in `sublime` and `sublime_plugin` modules.
+
+Just enough of the Sublime Text API to drive the plugin outside of Sublime.
+Every API call is counted so benchmarks and tests can check how many calls
+a code path makes, not only how long it takes.
+"""
+import importlib
+import os
+import sys
+import tempfile
+import types
+from array import array
+from bisect import bisect_right
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Name the plugin package is loaded under, as Sublime would.
+PACKAGE = 'RawLineEdit'
+
+HIDDEN = 128
+LAYOUT_INLINE = 0
+DIALOG_CANCEL = 0
+DIALOG_YES = 1
+DIALOG_NO = 2
+
+# Counts of every API call keyed by name.
+CALLS = Counter()
+
+# Callbacks queued with `set_timeout` and `set_timeout_async`.
+TIMEOUTS = []
+
+# Status bar messages.
+MESSAGES = []
+
+# Settings returned by `load_settings` keyed by file name.
+SETTINGS = {}
+
+# Folder returned by `cache_path`; tests point it at their own temporary folder.
+CACHE_PATH = os.path.join(tempfile.gettempdir(), 'RawLineEditFakeCache')
+
+
+def api(name):
+    """Decorate a function as an API call counted under `name`."""
+
+    def decorator(func):
+        """Wrap the function."""
+
+        def call(*args, **kwargs):
+            """Count the call."""
+
+            CALLS[name] += 1
+            return func(*args, **kwargs)
+
+        call.__name__ = func.__name__
+        call.__doc__ = func.__doc__
+        return call
+
+    return decorator
+
+
+def reset():
+    """Reset call counts, queued callbacks and messages."""
+
+    CALLS.clear()
+    del TIMEOUTS[:]
+    del MESSAGES[:]
+
+
+def drain(rounds=10):
+    """
+    Run the queued callbacks, including those they queue, for up to `rounds` rounds.
+
+    Pollers re-queue themselves forever, so the rounds are bounded.
+    """
+
+    for _ in range(rounds):
+        if not TIMEOUTS:
+            break
+        callbacks = TIMEOUTS[:]
+        del TIMEOUTS[:]
+        for callback in callbacks:
+            callback()
+
+
+class Region(object):
+    """Region."""
+
+    __slots__ = ('a', 'b')
+
+    def __init__(self, a, b=None):
+        """Initialize."""
+
+        self.a = a
+        self.b = a if b is None else b
+
+    def begin(self):
+        """Start of the region."""
+
+        return min(self.a, self.b)
+
+    def end(self):
+        """End of the region."""
+
+        return max(self.a, self.b)
+
+    def size(self):
+        """Size of the region."""
+
+        return abs(self.b - self.a)
+
+    def empty(self):
+        """Check if the region is empty."""
+
+        return self.a == self.b
+
+    def __len__(self):
+        """Size of the region."""
+
+        return self.size()
+
+    def __eq__(self, other):
+        """Compare regions."""
+
+        return isinstance(other, Region) and self.a == other.a and self.b == other.b
+
+    def __repr__(self):
+        """Representation."""
+
+        return 'Region(%d, %d)' % (self.a, self.b)
+
+
+class Settings(object):
+    """Settings."""
+
+    def __init__(self, values=None):
+        """Initialize."""
+
+        self.values = dict(values or {})
+
+    @api('settings.get')
+    def get(self, key, default=None):
+        """Get a setting."""
+
+        return self.values.get(key, default)
+
+    @api('settings.set')
+    def set(self, key, value):  # noqa: A003
+        """Set a setting."""
+
+        self.values[key] = value
+
+    @api('settings.erase')
+    def erase(self, key):
+        """Erase a setting."""
+
+        self.values.pop(key, None)
+
+    @api('settings.has')
+    def has(self, key):
+        """Check for a setting."""
+
+        return key in self.values
+
+
+class Selection(list):
+    """Selection."""
+
+    def add(self, region):
+        """Add a region."""
+
+        self.append(region)
+
+
+class Phantom(object):
+    """Phantom."""
+
+    __slots__ = ('region', 'content', 'layout')
+
+    def __init__(self, region, content, layout):
+        """Initialize."""
+
+        self.region = region
+        self.content = content
+        self.layout = layout
+
+
+class PhantomSet(object):
+    """Phantom set."""
+
+    def __init__(self, view, key=''):
+        """Initialize."""
+
+        self.view = view
+        self.key = key
+        self.phantoms = []
+
+    @api('phantom_set.update')
+    def update(self, phantoms):
+        """Replace the phantoms."""
+
+        self.phantoms = list(phantoms)
+        CALLS['phantoms'] += len(self.phantoms)
+
+
+class View(object):
+    """
+    View backed by a string.
+
+    Rows are located with an index of line starts that is rebuilt lazily after edits.
+    `rows` sets how many rows are considered visible.
+    """
+
+    _next_id = 1
+
+    def __init__(self, text='', line_endings='Unix', file_name=None, encoding='UTF-8', rows=50, window=None):
+        """Initialize."""
+
+        self.parent = window
+        self.view_id = View._next_id
+        View._next_id += 1
+        self.text = text
+        self.endings = line_endings
+        self.name = file_name
+        self.encoding_name = encoding
+        self.visible_rows = rows
+        self.starts = None
+        self.regions = {}
+        self.selection = Selection()
+        self.view_settings = Settings()
+        self.status = {}
+        self.dirty = False
+        self.scratch = False
+        self.changes = 0
+        self.loading = False
+        self.read_only = False
+        self.valid = True
+
+    def line_starts(self):
+        """Return the offsets every row starts at."""
+
+        if self.starts is None:
+            starts = array('Q', [0])
+            text = self.text
+            pos = text.find('\n')
+            while pos != -1:
+                starts.append(pos + 1)
+                pos = text.find('\n', pos + 1)
+            self.starts = starts
+        return self.starts
+
+    def modified(self, inserted=0):
+        """Note a change of the buffer that inserted `inserted` characters."""
+
+        self.starts = None
+        self.dirty = True
+        self.changes += 1
+        CALLS['inserted'] += inserted
+
+    @api('view.id')
+    def id(self):  # noqa: A003
+        """View id."""
+
+        return self.view_id
+
+    @api('view.is_valid')
+    def is_valid(self):
+        """Check if the view is valid."""
+
+        return self.valid
+
+    @api('view.is_loading')
+    def is_loading(self):
+        """Check if the view is loading."""
+
+        return self.loading
+
+    @api('view.change_count')
+    def change_count(self):
+        """Number of changes made to the buffer."""
+
+        return self.changes
+
+    @api('view.is_dirty')
+    def is_dirty(self):
+        """Check if the view has unsaved changes (scratch views never do)."""
+
+        return self.dirty and not self.scratch
+
+    @api('view.window')
+    def window(self):
+        """Window of the view."""
+
+        return self.parent
+
+    @api('view.file_name')
+    def file_name(self):
+        """File name of the view."""
+
+        return self.name
+
+    @api('view.encoding')
+    def encoding(self):
+        """Encoding of the view."""
+
+        return self.encoding_name
+
+    @api('view.settings')
+    def settings(self):
+        """Settings of the view."""
+
+        return self.view_settings
+
+    @api('view.size')
+    def size(self):
+        """Size of the buffer."""
+
+        return len(self.text)
+
+    @api('view.substr')
+    def substr(self, x):
+        """Text of a region or the character at a point."""
+
+        if isinstance(x, Region):
+            return self.text[x.begin():x.end()]
+        return self.text[x:x + 1]
+
+    @api('view.text_point')
+    def text_point(self, row, col):
+        """Convert a row and column to a point."""
+
+        starts = self.line_starts()
+        if row >= len(starts):
+            return len(self.text)
+        return min(starts[max(row, 0)] + col, len(self.text))
+
+    @api('view.rowcol')
+    def rowcol(self, pt):
+        """Convert a point to a row and column."""
+
+        starts = self.line_starts()
+        row = bisect_right(starts, pt) - 1
+        return row, pt - starts[row]
+
+    @api('view.split_by_newlines')
+    def split_by_newlines(self, region):
+        """Split a region into one region per line."""
+
+        regions = []
+        begin, end = region.begin(), region.end()
+        pos = begin
+        while True:
+            index = self.text.find('\n', pos, end)
+            if index == -1:
+                regions.append(Region(pos, end))
+                break
+            regions.append(Region(pos, index))
+            pos = index + 1
+        return regions
+
+    @api('view.visible_region')
+    def visible_region(self):
+        """Region of the visible rows."""
+
+        starts = self.line_starts()
+        end = starts[self.visible_rows] if self.visible_rows < len(starts) else len(self.text)
+        return Region(0, end)
+
+    @api('view.sel')
+    def sel(self):
+        """Selection."""
+
+        return self.selection
+
+    @api('view.show_at_center')
+    def show_at_center(self, x):
+        """Scroll a point or region to the center of the view."""
+
+    @api('view.line_endings')
+    def line_endings(self):
+        """Line ending style."""
+
+        return self.endings
+
+    @api('view.set_line_endings')
+    def set_line_endings(self, style):
+        """Set the line ending style."""
+
+        self.endings = style
+
+    @api('view.add_regions')
+    def add_regions(self, key, regions, scope='', icon='', flags=0):
+        """Add regions under a key."""
+
+        self.regions[key] = list(regions)
+        CALLS['regions'] += len(self.regions[key])
+
+    @api('view.get_regions')
+    def get_regions(self, key):
+        """Get the regions under a key."""
+
+        return list(self.regions.get(key, []))
+
+    @api('view.erase_regions')
+    def erase_regions(self, key):
+        """Erase the regions under a key."""
+
+        self.regions.pop(key, None)
+
+    @api('view.insert')
+    def insert(self, edit, pt, text):
+        """Insert text at a point."""
+
+        self.text = self.text[:pt] + text + self.text[pt:]
+        self.modified(len(text))
+        return len(text)
+
+    @api('view.erase')
+    def erase(self, edit, region):
+        """Erase a region."""
+
+        self.text = self.text[:region.begin()] + self.text[region.end():]
+        self.modified()
+
+    @api('view.replace')
+    def replace(self, edit, region, text):
+        """Replace a region."""
+
+        self.text = self.text[:region.begin()] + text + self.text[region.end():]
+        self.modified(len(text))
+
+    @api('view.set_status')
+    def set_status(self, key, value):
+        """Set a status bar entry."""
+
+        self.status[key] = value
+
+    @api('view.set_read_only')
+    def set_read_only(self, value):
+        """Set the view read only."""
+
+        self.read_only = value
+
+    @api('view.set_scratch')
+    def set_scratch(self, value):
+        """Set the view as scratch."""
+
+        self.scratch = value
+
+    @api('view.assign_syntax')
+    def assign_syntax(self, syntax):
+        """Assign a syntax."""
+
+    @api('view.set_syntax_file')
+    def set_syntax_file(self, syntax):
+        """Set the syntax file."""
+
+    @api('view.run_command')
+    def run_command(self, name, args=None):
+        """Run a text command of the loaded plugin."""
+
+        cls = COMMANDS.get(name)
+        if cls is not None:
+            cls(self).run(None, **(args or {}))
+
+
+class Window(object):
+    """Window holding views and output panels."""
+
+    def __init__(self):
+        """Initialize."""
+
+        self.view_list = []
+        self.panels = {}
+        self.active = None
+        self.panel = None
+        self.folder_list = []
+
+    def add_view(self, view):
+        """Add a view to the window and focus it."""
+
+        view.parent = self
+        self.view_list.append(view)
+        self.active = view
+        return view
+
+    @api('window.folders')
+    def folders(self):
+        """Project folders of the window."""
+
+        return list(self.folder_list)
+
+    @api('window.views')
+    def views(self):
+        """Views of the window."""
+
+        return list(self.view_list)
+
+    @api('window.active_view')
+    def active_view(self):
+        """Focused view."""
+
+        return self.active
+
+    @api('window.active_view_in_group')
+    def active_view_in_group(self, group):
+        """Focused view of a group; there is only one group."""
+
+        return self.active
+
+    @api('window.get_view_index')
+    def get_view_index(self, view):
+        """Group and index of a view, `(-1, -1)` for output panels."""
+
+        if view in self.view_list:
+            return 0, self.view_list.index(view)
+        return -1, -1
+
+    @api('window.active_panel')
+    def active_panel(self):
+        """Name of the shown panel."""
+
+        return self.panel
+
+    @api('window.focus_view')
+    def focus_view(self, view):
+        """Focus a view."""
+
+        self.active = view
+
+    @api('window.new_file')
+    def new_file(self):
+        """Open an empty view."""
+
+        return self.add_view(View())
+
+    @api('window.open_file')
+    def open_file(self, file_name):
+        """Open a file as Sublime does, with its line endings normalized to newlines."""
+
+        with open(file_name, 'r', encoding='utf-8', newline='') as f:
+            text = f.read()
+        style = 'Windows' if '\r\n' in text else 'CR' if '\r' in text else 'Unix'
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+        return self.add_view(View(text, style, file_name))
+
+    @api('window.run_command')
+    def run_command(self, name, args=None):
+        """Run a window command; only closing a file and showing or hiding panels do anything."""
+
+        if name == 'show_panel':
+            self.panel = args['panel']
+        elif name == 'hide_panel':
+            self.panel = None
+        elif name == 'close_file' and self.active in self.view_list:
+            self.active.valid = False
+            self.view_list.remove(self.active)
+            self.active = self.view_list[-1] if self.view_list else None
+
+    @api('window.find_output_panel')
+    def find_output_panel(self, name):
+        """Find an output panel."""
+
+        return self.panels.get(name)
+
+    @api('window.id')
+    def id(self):  # noqa: A003
+        """Window id."""
+
+        return id(self)
+
+    @api('window.create_output_panel')
+    def create_output_panel(self, name):
+        """Get or create an output panel."""
+
+        if name not in self.panels:
+            self.panels[name] = View(window=self)
+        return self.panels[name]
+
+    get_output_panel = create_output_panel
+
+    @api('window.destroy_output_panel')
+    def destroy_output_panel(self, name):
+        """Destroy an output panel."""
+
+        panel = self.panels.pop(name, None)
+        if panel is not None:
+            panel.valid = False
+
+
+@api('load_settings')
+def load_settings(name):
+    """Load settings."""
+
+    if name not in SETTINGS:
+        SETTINGS[name] = Settings()
+    return SETTINGS[name]
+
+
+@api('platform')
+def platform():
+    """Platform Sublime runs on."""
+
+    return 'linux'
+
+
+@api('cache_path')
+def cache_path():
+    """Path of the cache folder."""
+
+    return CACHE_PATH
+
+
+@api('set_timeout')
+def set_timeout(callback, delay=0):
+    """Queue a callback."""
+
+    TIMEOUTS.append(callback)
+
+
+@api('set_timeout_async')
+def set_timeout_async(callback, delay=0):
+    """Queue a callback."""
+
+    TIMEOUTS.append(callback)
+
+
+@api('status_message')
+def status_message(msg):
+    """Show a status bar message."""
+
+    MESSAGES.append(msg)
+
+
+@api('error_message')
+def error_message(msg):
+    """Show an error message."""
+
+    MESSAGES.append(msg)
+
+
+@api('ok_cancel_dialog')
+def ok_cancel_dialog(msg, ok_title=''):
+    """Answer a dialog with cancel."""
+
+    return False
+
+
+@api('yes_no_cancel_dialog')
+def yes_no_cancel_dialog(msg, yes_title='', no_title=''):
+    """Answer a dialog with cancel."""
+
+    return DIALOG_CANCEL
+
+
+@api('run_command')
+def run_command(name, args=None):
+    """Run an application command."""
+
+
+# Text commands of the loaded plugin keyed by command name.
+COMMANDS = {}
+
+
+class Command(object):
+    """Command."""
+
+
+class TextCommand(Command):
+    """Text command."""
+
+    def __init__(self, view):
+        """Initialize."""
+
+        self.view = view
+
+
+class WindowCommand(Command):
+    """Window command."""
+
+    def __init__(self, window):
+        """Initialize."""
+
+        self.window = window
+
+
+class ApplicationCommand(Command):
+    """Application command."""
+
+
+class EventListener(object):
+    """Event listener."""
+
+
+class ViewEventListener(object):
+    """View event listener."""
+
+    def __init__(self, view):
+        """Initialize."""
+
+        self.view = view
+
+
+def command_name(cls):
+    """Derive a command's name from its class name the way Sublime does."""
+
+    name = cls.__name__
+    if name.endswith('Command'):
+        name = name[:-7]
+    return ''.join('_' + c.lower() if c.isupper() else c for c in name).lstrip('_')
+
+
+def install():
+    """Install the stand-in modules as `sublime` and `sublime_plugin`."""
+
+    this = sys.modules[__name__]
+    sublime = types.ModuleType('sublime')
+    for name in (
+        'HIDDEN', 'LAYOUT_INLINE', 'DIALOG_CANCEL', 'DIALOG_YES', 'DIALOG_NO',
+        'Region', 'Settings', 'Selection', 'Phantom', 'PhantomSet', 'View', 'Window',
+        'load_settings', 'platform', 'cache_path', 'set_timeout', 'set_timeout_async', 'status_message',
+        'error_message', 'ok_cancel_dialog', 'yes_no_cancel_dialog', 'run_command'
+    ):
+        setattr(sublime, name, getattr(this, name))
+    plugin = types.ModuleType('sublime_plugin')
+    for name in ('TextCommand', 'WindowCommand', 'ApplicationCommand', 'EventListener', 'ViewEventListener'):
+        setattr(plugin, name, getattr(this, name))
+    sys.modules['sublime'] = sublime
+    sys.modules['sublime_plugin'] = plugin
+
+
+def load_plugin():
+    """Install the stand-in modules and import the plugin as Sublime would, as a module of its package."""
+
+    if PACKAGE + '.raw_line_edit' not in sys.modules:
+        install()
+        package = types.ModuleType(PACKAGE)
+        package.__path__ = [ROOT]
+        sys.modules[PACKAGE] = package
+    module = importlib.import_module(PACKAGE + '.raw_line_edit')
+    for value in vars(module).values():
+        if isinstance(value, type) and issubclass(value, TextCommand) and value is not TextCommand:
+            COMMANDS[command_name(value)] = value
+    return module
@@ -0,0 +1,463 @@
+"""Test how many Sublime API calls the commands make."""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from .bench import fake
+
+# Rows rendered around the fake view's 50 visible rows with the default margin of 200.
+RENDERED = 50 + 1 + 200
+
+
+class TestApiCalls(unittest.TestCase):
+    """Assert that API calls scale with line ending runs and visible rows, not with lines."""
+
+    def setUp(self):
+        """Setup."""
+
+        self.plugin = fake.load_plugin()
+        self.temp = tempfile.mkdtemp()
+        fake.CACHE_PATH = os.path.join(self.temp, 'cache')
+        fake.reset()
+
+    def tearDown(self):
+        """Cleanup."""
+
+        self.plugin.VIEWS.clear()
+        self.plugin.BUSY.clear()
+        fake.SETTINGS.clear()
+        fake.reset()
+        shutil.rmtree(self.temp)
+
+    def write(self, lines, every=0, newline='\n'):
+        """Write a file of `lines` lines where every `every` line ends with CRLF and return its path."""
+
+        path = os.path.join(self.temp, 'file_%d_%d.txt' % (lines, every))
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write(
+                ''.join(
+                    'line %d%s' % (row, '\r\n' if every and row % every == 0 else newline) for row in range(lines)
+                )
+            )
+        return path
+
+    def open_file(self, path):
+        """Open the file in a fake window."""
+
+        window = fake.Window()
+        window.new_file()
+        return window.open_file(path)
+
+    def run_command(self, command, *args, **kwargs):
+        """Run a command and its background work and return the API calls it made."""
+
+        fake.reset()
+        command.run(None, *args, **kwargs)
+        fake.drain()
+        return dict(fake.CALLS)
+
+    def toggle(self, view):
+        """Toggle raw line mode and return the API calls."""
+
+        return self.run_command(self.plugin.ToggleRawLineEditCommand(view))
+
+    def runs(self, view):
+        """Count the line ending runs of a raw line view."""
+
+        return len(self.plugin.get_ending_map(view).kinds)
+
+    def assertCalls(self, calls, **bounds):  # noqa: N802
+        """Assert that each named call was made at most the given number of times."""
+
+        for name, bound in bounds.items():
+            name = name.replace('__', '.')
+            self.assertLessEqual(calls.get(name, 0), bound, name)
+
+    def test_toggle_on_uniform(self):
+        """Test that enabling raw line mode on uniform files makes the same calls regardless of size."""
+
+        results = []
+        for lines in (1000, 100000):
+            view = self.open_file(self.write(lines))
+            calls = self.toggle(view)
+            self.assertTrue(view.settings().get('RawLineEdit'))
+            self.assertCalls(
+                calls, view__substr=0, view__get_regions=0, view__add_regions=3, phantom_set__update=1,
+                phantoms=RENDERED, view__text_point=0
+            )
+            # The text is inserted, and its scan progress reported, in chunks.
+            calls.pop('view.insert', None)
+            calls.pop('inserted', None)
+            calls.pop('status_message', None)
+            results.append(calls)
+        self.assertEqual(results[0], results[1])
+
+    def test_toggle_on_mixed(self):
+        """Test that enabling raw line mode on mixed files scales with runs."""
+
+        view = self.open_file(self.write(100000, 100))
+        calls = self.toggle(view)
+        runs = self.runs(view)
+        self.assertEqual(runs, 2000)
+        self.assertCalls(
+            calls, view__substr=0, view__get_regions=0, view__add_regions=3, phantom_set__update=1,
+            phantoms=RENDERED, view__text_point=0
+        )
+
+    def test_toggle_off(self):
+        """Test that leaving raw line mode makes the same calls regardless of size."""
+
+        results = []
+        for lines in (1000, 100000):
+            view = self.open_file(self.write(lines, 100))
+            self.toggle(view)
+            calls = self.toggle(view)
+            self.assertFalse(view.is_valid())
+            results.append(calls)
+        self.assertEqual(results[0], results[1])
+
+    def test_popup(self):
+        """Test that the popup panel scales with runs and in summary mode with anomalies."""
+
+        fake.load_settings('raw_line_edit.sublime-settings').set('popup_summary_lines', 0)
+        fake.load_settings('raw_line_edit.sublime-settings').set('popup_summary_bytes', 0)
+        view = self.open_file(self.write(100000, 100))
+        calls = self.run_command(self.plugin.PopupRawLineEditCommand(view))
+        panel = view.window().find_output_panel('raw_line_edit_view')
+        self.assertEqual(self.runs(panel), 2000)
+        self.assertCalls(
+            calls, view__substr=0, view__get_regions=0, view__add_regions=3, phantom_set__update=1,
+            phantoms=RENDERED, view__text_point=0
+        )
+
+        fake.load_settings('raw_line_edit.sublime-settings').set('popup_summary_lines', 1000)
+        calls = self.run_command(self.plugin.PopupRawLineEditCommand(view))
+        panel = view.window().find_output_panel('raw_line_edit_view')
+        self.assertTrue(panel.settings().get('RawLineEditSummary'))
+        # 1000 anomalies with two rows of context on either side.
+        self.assertLessEqual(len(panel.line_starts()), 1000 * 5 + 1)
+        # The panel's old text is read once to compare it.
+        self.assertCalls(calls, view__substr=1, phantom_set__update=1, phantoms=RENDERED)
+
+    def test_popup_summary_file(self):
+        """Test that a file over the summary threshold is summarized from disk without decoding all of it."""
+
+        settings = fake.load_settings('raw_line_edit.sublime-settings')
+        settings.set('popup_summary_lines', 0)
+        settings.set('popup_summary_bytes', 1024)
+        path = self.write(20000, 1000)
+        with open(path, encoding='utf-8', newline='') as f:
+            expected = self.plugin.summarize(*self.plugin.scan_text(f.read()), context=2)[0]
+
+        read_file = self.plugin.read_file
+        self.plugin.read_file = None
+        try:
+            view = self.open_file(path)
+            self.run_command(self.plugin.PopupRawLineEditCommand(view))
+        finally:
+            self.plugin.read_file = read_file
+        panel = view.window().find_output_panel('raw_line_edit_view')
+        self.assertTrue(panel.settings().get('RawLineEditSummary'))
+        self.assertEqual(panel.text, expected)
+
+        # Encodings whose endings can't be found in the raw bytes are decoded instead.
+        with open(path, encoding='utf-8', newline='') as f:
+            text = f.read()
+        with open(path, 'wb') as f:
+            f.write(text.encode('utf-16'))
+        view.encoding_name = 'UTF-16 LE with BOM'
+        self.run_command(self.plugin.PopupRawLineEditCommand(view))
+        panel = view.window().find_output_panel('raw_line_edit_view')
+        self.assertTrue(panel.settings().get('RawLineEditSummary'))
+        self.assertEqual(panel.text, expected)
+
+    def test_popup_scan_once(self):
+        """Test that a file under the summary thresholds is scanned once, and its map is cached."""
+
+        path = self.write(1000, 10)
+        cache = self.plugin.get_ending_cache()
+        shutil.rmtree(cache.folder, ignore_errors=True)
+        scan = sys.modules[self.plugin.StreamScanner.__module__]
+        split_endings = scan.split_endings
+        split = []
+        scan.split_endings = lambda text: split.append(len(text)) or split_endings(text)
+        try:
+            view = self.open_file(path)
+            self.run_command(self.plugin.PopupRawLineEditCommand(view))
+        finally:
+            scan.split_endings = split_endings
+        # The map from the scan of the raw bytes is reused to decode the file.
+        self.assertEqual(split, [])
+        panel = view.window().find_output_panel('raw_line_edit_view')
+        self.assertFalse(panel.settings().get('RawLineEditSummary'))
+        with open(path, 'rb') as f:
+            key = self.plugin.file_key(path, f.read())
+        self.assertEqual(cache.get(path, key), ('utf-8', self.plugin.get_ending_map(panel)))
+
+    def test_popup_reuse(self):
+        """Test that the popup panel is reused and only changed rows are rewritten."""
+
+        fake.load_settings('raw_line_edit.sublime-settings').set('popup_summary_lines', 0)
+        path = self.write(100000, 100)
+        view = self.open_file(path)
+        command = self.plugin.PopupRawLineEditCommand(view)
+        self.run_command(command)
+        panel = view.window().find_output_panel('raw_line_edit_view')
+        text = panel.text
+
+        # Nothing changed, so the panel is just shown again.
+        calls = self.run_command(command)
+        self.assertIs(view.window().find_output_panel('raw_line_edit_view'), panel)
+        self.assertCalls(calls, view__substr=0, view__replace=0, view__insert=0, phantom_set__update=0)
+
+        st = os.stat(path)
+        with open(path, 'r+b') as f:
+            f.seek(len('line 0\r\n'))
+            f.write(b'LINE 1\r')
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+        calls = self.run_command(command)
+        self.assertIs(view.window().find_output_panel('raw_line_edit_view'), panel)
+        self.assertEqual(panel.text, text.replace('line 1\n', 'LINE 1\n', 1))
+        self.assertEqual(self.plugin.get_ending_map(panel).kind_at(1), self.plugin.CR)
+        self.assertCalls(calls, view__substr=1, inserted=len('LINE 1\n'), phantom_set__update=1)
+
+    def test_insert(self):
+        """Test that changing line endings scales with selections and runs."""
+
+        view = self.open_file(self.write(100000, 100))
+        self.toggle(view)
+        view.sel().add(fake.Region(0, view.size()))
+        calls = self.run_command(self.plugin.RawLineInsertCommand(view), style='Windows')
+        self.assertEqual(self.runs(view), 1)
+        self.assertCalls(
+            calls, view__substr=0, view__get_regions=0, view__rowcol=4, phantom_set__update=1,
+            phantoms=RENDERED, view__text_point=0
+        )
+
+        del view.sel()[:]
+        for row in range(0, 100000, 100):
+            view.sel().add(fake.Region(view.text_point(row, 0)))
+        calls = self.run_command(self.plugin.RawLineInsertCommand(view), style='Unix')
+        runs = self.runs(view)
+        self.assertEqual(runs, 2000)
+        self.assertCalls(
+            calls, view__substr=0, view__get_regions=0, view__rowcol=2 * 1000 + 2, phantom_set__update=1,
+            phantoms=RENDERED, view__text_point=0
+        )
+
+    def test_goto_mixed_ending(self):
+        """Test that jumping to mixed line endings takes a constant number of calls."""
+
+        view = self.open_file(self.write(100000, 30000))
+        self.toggle(view)
+        command = self.plugin.RawLineEditGotoMixedEndingCommand(view)
+        rows = []
+        for forward in (True, True, True, True, True, False, False):
+            calls = self.run_command(command, forward=forward)
+            rows.append(view.rowcol(view.sel()[0].begin())[0])
+            self.assertCalls(calls, view__rowcol=1, view__text_point=0, view__substr=0, phantom_set__update=0)
+        self.assertEqual(rows, [30000, 60000, 90000, 0, 30000, 0, 90000])
+
+        # In a summary popup the anomalies can outnumber the context rows.
+        settings = fake.load_settings('raw_line_edit.sublime-settings')
+        settings.set('popup_summary_lines', 1000)
+        settings.set('popup_summary_bytes', 0)
+        path = os.path.join(self.temp, 'block.txt')
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write(''.join('line %d%s' % (row, '\r\n' if 10000 <= row < 10100 else '\n') for row in range(20000)))
+        view = self.open_file(path)
+        self.run_command(self.plugin.PopupRawLineEditCommand(view))
+        panel = view.window().find_output_panel('raw_line_edit_view')
+        self.assertEqual(self.plugin.get_ending_map(panel).dominant, self.plugin.CRLF)
+        command = self.plugin.RawLineEditGotoMixedEndingCommand(panel)
+        rows = []
+        for forward in (True, True, False, False):
+            self.run_command(command, forward=forward)
+            rows.append(panel.rowcol(panel.sel()[0].begin())[0])
+        self.assertEqual(rows, [2, 3, 2, 101])
+
+    def test_audit(self):
+        """Test that the audit runs on a thread of its own and reports failures."""
+
+        def run(window):
+            """Run the audit and wait for it."""
+
+            self.plugin.RawLineEditAuditCommand(window).run()
+            for thread in threading.enumerate():
+                if thread.name == 'RawLineEditAudit':
+                    thread.join()
+            self.assertEqual(self.plugin.AUDITING, set())
+            fake.drain()
+
+        folder = os.path.join(self.temp, 'project')
+        os.mkdir(folder)
+        with open(os.path.join(folder, 'mixed.txt'), 'wb') as f:
+            f.write(b'a\nb\r\nc\n')
+        window = fake.Window()
+        window.folder_list = [folder]
+        run(window)
+        self.assertTrue(
+            window.find_output_panel('raw_line_edit_audit').text.startswith(
+                'Line ending audit: 1 of 1 files need attention'
+            )
+        )
+
+        iter_files = self.plugin.iter_files
+
+        def fail(*args):
+            """Fail to walk the folders."""
+
+            raise OSError('boom')
+
+        self.plugin.iter_files = fail
+        try:
+            run(window)
+        finally:
+            self.plugin.iter_files = iter_files
+        self.assertIn('Line ending audit failed: boom', fake.MESSAGES[-1])
+
+    def test_reapply_buffer(self):
+        """Test that an unsaved buffer is reapplied on load rather than after a poll."""
+
+        buffer = self.plugin.RawLineTextBuffer
+        listener = self.plugin.RawLineEditListener()
+
+        view = fake.View('old')
+        buffer.check_loading(view, 'new')
+        self.assertEqual(view.text, 'new')
+        self.assertEqual(fake.TIMEOUTS, [])
+
+        view = fake.View('old')
+        view.loading = True
+        buffer.check_loading(view, 'new')
+        other = fake.View('other')
+        other.loading = True
+        buffer.check_loading(other, 'new other')
+        listener.on_load(fake.View('unrelated'))
+        self.assertEqual(view.text, 'old')
+        view.loading = False
+        listener.on_load(view)
+        self.assertEqual(view.text, 'new')
+        self.assertFalse(buffer.waiting(view))
+        # Each view waits for its own buffer.
+        self.assertEqual(other.text, 'other')
+        other.loading = False
+        listener.on_load(other)
+        self.assertEqual(other.text, 'new other')
+        # The safety net poll finds nothing left to do.
+        fake.drain()
+        self.assertEqual(fake.TIMEOUTS, [])
+
+    def test_save(self):
+        """Test that saving rewrites runs, not lines."""
+
+        listener = self.plugin.RawLineEditListener()
+        view = self.open_file(self.write(100000, 100))
+        self.toggle(view)
+        text = view.text
+        fake.reset()
+        listener.on_pre_save(view)
+        calls = dict(fake.CALLS)
+        self.assertEqual(view.text.count('\r\n'), 1000)
+        # Half of the runs are CRLF.
+        self.assertCalls(calls, view__substr=1000, view__replace=1000, view__text_point=0)
+
+        fake.reset()
+        listener.on_post_save(view)
+        calls = dict(fake.CALLS)
+        self.assertEqual(view.text, text)
+        self.assertCalls(calls, view__substr=1000, view__replace=1000, phantom_set__update=1, phantoms=RENDERED)
+
+        view = self.open_file(self.write(100000, newline='\r\n'))
+        self.toggle(view)
+        fake.reset()
+        listener.on_pre_save(view)
+        listener.on_post_save(view)
+        self.assertCalls(dict(fake.CALLS), view__substr=0, view__replace=0, view__text_point=0)
+
+    def test_save_dense(self):
+        """Test that saving alternating line endings rewrites the buffer once, not once per run."""
+
+        listener = self.plugin.RawLineEditListener()
+        path = self.write(20000, 2)
+        with open(path, 'rb') as f:
+            data = f.read()
+        view = self.open_file(path)
+        self.toggle(view)
+        self.assertEqual(self.runs(view), 20000)
+        text = view.text
+        fake.reset()
+        listener.on_pre_save(view)
+        self.assertEqual(view.text.encode('utf-8'), data)
+        self.assertCalls(dict(fake.CALLS), view__substr=1, view__replace=1, view__text_point=0)
+
+        fake.reset()
+        listener.on_post_save(view)
+        self.assertEqual(view.text, text)
+        self.assertCalls(dict(fake.CALLS), view__substr=1, view__replace=1, phantom_set__update=1)
+
+    def test_cache(self):
+        """Test that showing an unchanged file again uses its cached ending map."""
+
+        path = self.write(1000, 10)
+        cache = self.plugin.get_ending_cache()
+        shutil.rmtree(cache.folder, ignore_errors=True)
+        encodings = self.plugin.candidates('UTF-8')
+        text, endings, offsets = self.plugin.read_file(path, encodings, cache=cache)
+        self.assertIsNone(offsets)
+        with open(path, 'rb') as f:
+            key = self.plugin.file_key(path, f.read())
+        self.assertEqual(cache.get(path, key), ('utf-8', endings))
+        self.assertEqual(self.plugin.read_file(path, encodings, cache=cache), (text, endings, None))
+        # Row offsets are found while decoding a cached file too.
+        offsets = self.plugin.read_file(path, encodings, cache=cache, offsets=True)[2]
+        self.assertEqual(offsets, self.plugin.row_offsets(''.join(text)))
+
+        view = self.open_file(path)
+        self.toggle(view)
+        self.assertEqual(self.plugin.get_ending_map(view), endings)
+
+    def test_read_buffer(self):
+        """Test that reading an unsaved buffer takes one call regardless of lines."""
+
+        for text in ('a\nb\n' * 50000, 'a\nb'):
+            view = fake.View(text)
+            view.endings = 'Windows'
+            fake.reset()
+            self.assertEqual(self.plugin.read_view_buffer(view), text.replace('\n', '\r\n'))
+            self.assertCalls(dict(fake.CALLS), view__substr=1, view__split_by_newlines=0)
+
+    def test_polling(self):
+        """Test that the viewport is only polled while a raw line view is on screen."""
+
+        view = self.open_file(self.write(1000, 100))
+        self.toggle(view)
+        renderer = self.plugin.VIEWS[view.id()].renderer
+        self.assertTrue(renderer.polling)
+
+        window = view.window()
+        window.focus_view(window.new_file())
+        fake.drain()
+        self.assertFalse(renderer.polling)
+        self.assertEqual(fake.TIMEOUTS, [])
+
+        window.focus_view(view)
+        self.plugin.RawLineEditListener().on_activated(view)
+        self.assertTrue(renderer.polling)
+        fake.drain()
+        self.assertTrue(renderer.polling)
+
+    def test_close(self):
+        """Test that closing a raw line view releases its state."""
+
+        view = self.open_file(self.write(1000, 100))
+        self.toggle(view)
+        state = self.plugin.VIEWS[view.id()]
+        self.assertIsNotNone(state.endings)
+        self.assertIsNotNone(state.renderer)
+        # Replaced text isn't kept alive once written.
+        self.assertIsNone(state.text)
+        self.plugin.RawLineEditListener().on_close(view)
+        self.assertNotIn(view.id(), self.plugin.VIEWS)
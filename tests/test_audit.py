@@ -0,0 +1,82 @@
+"""Test line ending audit."""
+import os
+import shutil
+import tempfile
+import unittest
+from rle import audit
+
+
+class TestAudit(unittest.TestCase):
+    """Test auditing files with the cache."""
+
+    def setUp(self):
+        """Setup."""
+
+        self.temp = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.temp, '.git'))
+        os.mkdir(os.path.join(self.temp, 'sub'))
+        self.write('.git/config', b'a\r\n')
+        self.write('sub/lf.txt', b'a\nb\n')
+        self.write('sub/mixed.txt', b'a\nb\r\n')
+        self.write('sub/skip.log', b'a\r\n')
+        self.write('image.png', b'\x89PNG\r\n\x1a\n\0')
+
+    def tearDown(self):
+        """Cleanup."""
+
+        shutil.rmtree(self.temp)
+
+    def write(self, name, content):
+        """Write a test file."""
+
+        with open(os.path.join(self.temp, name), 'wb') as f:
+            f.write(content)
+
+    def path(self, name):
+        """Get the path of a test file."""
+
+        return os.path.join(self.temp, name)
+
+    def test_iter_files(self):
+        """Test that excluded folders and files are skipped."""
+
+        self.assertEqual(
+            list(audit.iter_files([self.temp], skip_files=['*.log'])),
+            [self.path('image.png'), self.path('sub/lf.txt'), self.path('sub/mixed.txt')]
+        )
+
+    def test_cache(self):
+        """Test that only new and changed files are rescanned."""
+
+        cache = audit.AuditCache()
+        files = list(audit.iter_files([self.temp]))
+        results = list(audit.audit(files, 'utf-8', cache))
+        self.assertEqual([r.path for r in results], files)
+        self.assertFalse(any(r.cached for r in results))
+        stats = {r.path: r.stats for r in results}
+        self.assertIsNone(stats[self.path('image.png')])
+        self.assertFalse(stats[self.path('sub/lf.txt')].mixed)
+        self.assertTrue(stats[self.path('sub/mixed.txt')].mixed)
+
+        self.write('sub/lf.txt', b'a\nb\r\nc\n')
+        results = list(audit.audit(files, 'utf-8', cache, workers=1))
+        self.assertEqual([r.path for r in results if not r.cached], [self.path('sub/lf.txt')])
+        self.assertTrue(results[files.index(self.path('sub/lf.txt'))].stats.mixed)
+
+        os.remove(self.path('sub/mixed.txt'))
+        files.remove(self.path('sub/mixed.txt'))
+        other = os.path.join(os.path.dirname(self.temp), 'other', 'file.txt')
+        cache.set(other, (1, 1), None)
+        # Files outside of the audited folders belong to other audits and are kept.
+        cache.prune(files, [self.temp])
+        self.assertEqual(len(cache), len(files) + 1)
+        self.assertEqual(cache.get(other, (1, 1)), (True, None))
+        cache.prune(files)
+        self.assertEqual(len(cache), len(files))
+
+    def test_error(self):
+        """Test that unreadable files report an error."""
+
+        result = list(audit.audit([self.path('missing.txt')], 'utf-8'))[0]
+        self.assertIsNone(result.stats)
+        self.assertIsNotNone(result.error)
@@ -0,0 +1,25 @@
+"""Test the benchmarks against their baselines."""
+import unittest
+from .bench import bench
+
+
+class TestBenchmarks(unittest.TestCase):
+    """Check the small benchmark cases against the stored baselines."""
+
+    def test_synthetic(self):
+        """Test the size and endings of the synthetic inputs."""
+
+        for pattern in bench.PATTERNS:
+            text = bench.synthetic(bench.SIZES['64KB'], pattern)
+            self.assertEqual(len(text), bench.SIZES['64KB'])
+        self.assertIn('\r\r\n', bench.synthetic(1024, 'pathological'))
+
+    def test_baselines(self):
+        """Test that API calls and peak memory did not regress; timings are left to the benchmark runner."""
+
+        baselines = bench.load_baselines()
+        for key, result in bench.run_cases(bench.SIZES['64KB'], repeat=1):
+            baseline = baselines.get(key)
+            self.assertIsNotNone(baseline, key)
+            result['seconds'] = 0
+            self.assertEqual(bench.compare(result, baseline), [], key)
@@ -0,0 +1,77 @@
+"""Test ending map cache."""
+import os
+import tempfile
+import unittest
+from rle import cache
+from rle.endings import EndingMap, LF, CR, CRLF
+
+
+class TestEndingCache(unittest.TestCase):
+    """Test storing, invalidating and evicting cached ending maps."""
+
+    def setUp(self):
+        """Setup temp directory."""
+
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.folder = os.path.join(self.tempdir.name, 'cache')
+
+    def tearDown(self):
+        """Cleanup temp directory."""
+
+        self.tempdir.cleanup()
+
+    def write(self, name, data):
+        """Write a temp file and return its path and key."""
+
+        file_name = os.path.join(self.tempdir.name, name)
+        with open(file_name, 'wb') as f:
+            f.write(data)
+        return file_name, cache.file_key(file_name, data)
+
+    def test_hit_and_miss(self):
+        """Test that entries are only found under the same key."""
+
+        ending_cache = cache.EndingCache(self.folder)
+        endings = EndingMap([(LF, 3), (CRLF, 1)])
+        file_name, key = self.write('a.txt', b'a\nb\nc\nd\r\n')
+        self.assertIsNone(ending_cache.get(file_name, key))
+        ending_cache.put(file_name, key, 'utf-8', endings)
+        self.assertEqual(ending_cache.get(file_name, key), ('utf-8', endings))
+
+        self.assertIsNone(ending_cache.get(file_name, (key[0], key[1] + 1, key[2])))
+        self.assertIsNone(ending_cache.get(file_name, (key[0], key[1], key[2] ^ 1)))
+        self.assertIsNone(ending_cache.get(os.path.join(self.tempdir.name, 'b.txt'), key))
+
+        # Corrupt entries are misses.
+        with open(ending_cache.entry(file_name), 'r+b') as f:
+            f.truncate(len(cache.MAGIC) + cache.HEADER.size + 6)
+        self.assertIsNone(ending_cache.get(file_name, key))
+
+    def test_fast_hash(self):
+        """Test that the hash covers the start and end of the data."""
+
+        data = bytearray(b'x' * (cache.HASH_SPAN * 3))
+        crc = cache.fast_hash(data)
+        data[-1:] = b'y'
+        self.assertNotEqual(cache.fast_hash(data), crc)
+        data[:1] = b'y'
+        self.assertNotEqual(cache.fast_hash(data), crc)
+        self.assertNotEqual(cache.fast_hash(b'ab'), cache.fast_hash(b'ba'))
+
+    def test_eviction(self):
+        """Test that the least recently used entries are evicted first."""
+
+        endings = EndingMap([(LF, 1), (CR, 1)] * 100)
+        entry_size = len(cache.MAGIC) + cache.HEADER.size + len('utf-8') + len(endings.to_bytes())
+        ending_cache = cache.EndingCache(self.folder, entry_size * 2)
+        files = [self.write('%d.txt' % i, b'%d' % i) for i in range(3)]
+        for index, (file_name, key) in enumerate(files[:2]):
+            ending_cache.put(file_name, key, 'utf-8', endings)
+            os.utime(ending_cache.entry(file_name), (index, index))
+
+        # Using the first file makes the second the least recently used.
+        self.assertIsNotNone(ending_cache.get(*files[0]))
+        ending_cache.put(files[2][0], files[2][1], 'utf-8', endings)
+        self.assertIsNotNone(ending_cache.get(*files[0]))
+        self.assertIsNone(ending_cache.get(*files[1]))
+        self.assertIsNotNone(ending_cache.get(*files[2]))
@@ -0,0 +1,102 @@
+"""Test the command line interface."""
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from rle import cli
+
+
+class TestCli(unittest.TestCase):
+    """Test reporting, checking and converting files from the command line."""
+
+    def setUp(self):
+        """Setup."""
+
+        self.temp = tempfile.mkdtemp()
+        self.files = {
+            'lf.txt': b'a\nb\nc\n',
+            'crlf.txt': b'a\r\nb\r\n',
+            'mixed.txt': b'a\nb\r\nc\n',
+            'binary.bin': b'\0\r\n\n'
+        }
+        os.mkdir(os.path.join(self.temp, 'sub'))
+        for name, content in self.files.items():
+            with open(os.path.join(self.temp, 'sub', name), 'wb') as f:
+                f.write(content)
+
+    def tearDown(self):
+        """Cleanup."""
+
+        shutil.rmtree(self.temp)
+
+    def run_cli(self, *args):
+        """Run the command line interface returning the exit status and output lines."""
+
+        out = io.StringIO()
+        status = cli.main(list(args) + [self.temp], out)
+        return status, sorted(out.getvalue().splitlines())
+
+    def path(self, name):
+        """Get the path of a test file."""
+
+        return os.path.join(self.temp, 'sub', name)
+
+    def read(self, name):
+        """Read a test file."""
+
+        with open(self.path(name), 'rb') as f:
+            return f.read()
+
+    def test_report(self):
+        """Test reporting every text file."""
+
+        for jobs in ('1', '2'):
+            status, lines = self.run_cli('report', '-j', jobs)
+            self.assertEqual(status, cli.OK)
+            self.assertEqual(
+                lines,
+                [
+                    '%s: CRLF 2' % self.path('crlf.txt'),
+                    '%s: LF 3' % self.path('lf.txt'),
+                    '%s: mixed (LF 2, CRLF 1), 1 run differs from LF, rows 2-2' % self.path('mixed.txt')
+                ]
+            )
+
+        status, lines = self.run_cli('report', '--json', '-j', '1')
+        records = [json.loads(line) for line in lines]
+        self.assertEqual({r['path']: r['dominant'] for r in records}[self.path('crlf.txt')], 'crlf')
+
+    def test_check(self):
+        """Test that checking fails on mixed endings or an unexpected ending type."""
+
+        status, lines = self.run_cli('check', '-j', '2')
+        self.assertEqual(status, cli.MIXED)
+        self.assertEqual(len(lines), 1)
+        self.assertTrue(lines[0].startswith(self.path('mixed.txt')))
+
+        os.remove(self.path('mixed.txt'))
+        self.assertEqual(self.run_cli('check', '-j', '1'), (cli.OK, []))
+        status, lines = self.run_cli('check', '--ending', 'lf', '-j', '1')
+        self.assertEqual(status, cli.MIXED)
+        self.assertEqual(lines, ['%s: CRLF 2' % self.path('crlf.txt')])
+
+    def test_convert(self):
+        """Test converting files, leaving binary files alone."""
+
+        status, lines = self.run_cli('convert', '--to', 'crlf', '-j', '2')
+        self.assertEqual(status, cli.OK)
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(self.read('lf.txt'), b'a\r\nb\r\nc\r\n')
+        self.assertEqual(self.read('mixed.txt'), b'a\r\nb\r\nc\r\n')
+        self.assertEqual(self.read('crlf.txt'), self.files['crlf.txt'])
+        self.assertEqual(self.read('binary.bin'), self.files['binary.bin'])
+        self.assertEqual(self.run_cli('check', '--ending', 'crlf', '-j', '1'), (cli.OK, []))
+
+    def test_error(self):
+        """Test that unreadable files give an error status."""
+
+        out = io.StringIO()
+        status = cli.main(['report', '-j', '1', os.path.join(self.temp, 'missing.txt')], out)
+        self.assertEqual(status, cli.ERROR)
@@ -0,0 +1,89 @@
+"""Test line ending conversion."""
+import unittest
+import os
+import tempfile
+from rle import convert, encoding, scan
+from rle.endings import EndingMap, LF, CR, CRLF
+
+
+class TestConvertFile(unittest.TestCase):
+    """Test converting files on disk."""
+
+    sample = 'a\r\nb\nc\rd\r\r\n\n€\r'
+
+    def setUp(self):
+        """Setup temp directory."""
+
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.file_name = os.path.join(self.tempdir.name, 'sample.txt')
+
+    def tearDown(self):
+        """Cleanup temp directory."""
+
+        self.tempdir.cleanup()
+
+    def write(self, data):
+        """Write the sample file."""
+
+        with open(self.file_name, 'wb') as f:
+            f.write(data)
+
+    def read(self):
+        """Read the sample file."""
+
+        with open(self.file_name, 'rb') as f:
+            return f.read()
+
+    def test_convert_bytes(self):
+        """Test conversion for every chunk size, straight on bytes."""
+
+        expected = {
+            LF: 'a\nb\nc\nd\n\n\n€\n',
+            CRLF: 'a\r\nb\r\nc\r\nd\r\n\r\n\r\n€\r\n',
+            CR: 'a\rb\rc\rd\r\r\r€\r'
+        }
+        for kind, text in expected.items():
+            for chunk_size in (1, 2, 3, 5, 1024):
+                self.write(self.sample.encode('utf-8'))
+                self.assertTrue(convert.convert_file(self.file_name, kind, chunk_size=chunk_size))
+                self.assertEqual(self.read(), text.encode('utf-8'), (kind, chunk_size))
+                self.assertFalse(convert.convert_file(self.file_name, kind, chunk_size=chunk_size))
+
+    def test_convert_wide_encoding(self):
+        """Test conversion of an encoding that must be decoded, keeping the BOM."""
+
+        enc = encoding.resolve('UTF-16 LE with BOM')
+        self.write(enc.bom + self.sample.encode('utf-16-le'))
+        for chunk_size in (1, 3, 1024):
+            convert.convert_file(self.file_name, CRLF, enc, chunk_size)
+            self.assertEqual(
+                self.read(),
+                enc.bom + 'a\r\nb\r\nc\r\nd\r\n\r\n\r\n€\r\n'.encode('utf-16-le'),
+                chunk_size
+            )
+
+    def test_empty(self):
+        """Test that an empty file is left alone."""
+
+        self.write(b'')
+        self.assertFalse(convert.convert_file(self.file_name, CRLF))
+        self.assertEqual(os.listdir(self.tempdir.name), ['sample.txt'])
+
+
+class TestRestoreEndings(unittest.TestCase):
+    """Test restoring the line endings of normalized text."""
+
+    def test_restore(self):
+        """Test that restoring the scanned endings gives back the original text."""
+
+        for text in (
+            '', 'a', 'a\n', 'a\nb\nc', 'a\r\nb\r\n', 'a\rb\r', 'a\r\nb\nc\rd\r\r\n\n€\r',
+            'x\r\n' * 100 + 'y\n' * 100 + 'z'
+        ):
+            normalized, endings = scan.scan_text(text)
+            self.assertEqual(convert.restore_endings(normalized, endings), text, repr(text))
+
+    def test_uniform(self):
+        """Test that uniform endings are restored in one replace."""
+
+        self.assertEqual(convert.restore_endings('a\nb\nc', EndingMap([(CRLF, 2)])), 'a\r\nb\r\nc')
@@ -0,0 +1,38 @@
+"""Test text difference."""
+import random
+import unittest
+from rle.diff import changed_span, common_prefix, common_suffix
+
+
+class TestDiff(unittest.TestCase):
+    """Test finding the changed rows between two texts."""
+
+    def test_common(self):
+        """Test common prefixes and suffixes."""
+
+        self.assertEqual(common_prefix('abcd', 'abxd'), 2)
+        self.assertEqual(common_prefix('abc', 'abc'), 3)
+        self.assertEqual(common_prefix('', 'abc'), 0)
+        self.assertEqual(common_suffix('abcd', 'axcd', 4), 2)
+        self.assertEqual(common_suffix('aaaa', 'aa', 1), 1)
+
+    def test_changed_span(self):
+        """Test that replacing the span of random edits gives the new text and covers whole rows."""
+
+        self.assertIsNone(changed_span('a\nb', 'a\nb'))
+        self.assertEqual(changed_span('a\nb\nc\n', 'a\nx\nc\n'), (2, 4, 4))
+
+        rng = random.Random(3)
+        for _ in range(500):
+            old = ''.join(rng.choice('ab\n') for _ in range(rng.randrange(0, 30)))
+            start = rng.randrange(0, len(old) + 1)
+            end = rng.randrange(start, len(old) + 1)
+            new = old[:start] + ''.join(rng.choice('ab\n') for _ in range(rng.randrange(0, 5))) + old[end:]
+            span = changed_span(old, new)
+            if span is None:
+                self.assertEqual(old, new)
+                continue
+            begin, old_end, new_end = span
+            self.assertEqual(old[:begin] + new[begin:new_end] + old[old_end:], new)
+            self.assertTrue(begin == 0 or old[begin - 1] == '\n')
+            self.assertTrue(old_end in (0, len(old)) or old[old_end - 1] == '\n')
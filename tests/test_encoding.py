@@ -0,0 +1,34 @@
+"""Test encoding resolution."""
+import unittest
+import codecs
+from rle import encoding
+
+
+class TestResolve(unittest.TestCase):
+    """Test resolving Sublime encoding names."""
+
+    def test_names(self):
+        """Test names from the table and derived from the name."""
+
+        self.assertEqual(encoding.resolve('UTF-8'), ('utf-8', None))
+        self.assertEqual(encoding.resolve('UTF-8 with BOM'), ('utf-8', codecs.BOM_UTF8))
+        self.assertEqual(encoding.resolve('UTF-16 LE with BOM'), ('utf-16-le', codecs.BOM_UTF16_LE))
+        self.assertEqual(encoding.resolve('Western (Windows 1252)').codec, 'cp1252')
+        self.assertEqual(encoding.resolve('Greek (ISO 8859-7)').codec, 'iso8859-7')
+        self.assertEqual(encoding.resolve('Hexadecimal'), encoding.UTF8)
+        self.assertEqual(encoding.resolve('Not A Codec'), encoding.UTF8)
+
+    def test_candidates(self):
+        """Test that UTF-8 is always the fallback and never tried twice."""
+
+        self.assertEqual(encoding.candidates('UTF-8 with BOM'), (encoding.UTF8,))
+        self.assertEqual(encoding.candidates('Undefined'), (encoding.UTF8,))
+        self.assertEqual(encoding.candidates('Western (Windows 1252)')[-1], encoding.UTF8)
+
+    def test_decode_start(self):
+        """Test that the BOM is skipped only when present."""
+
+        bom = encoding.resolve('UTF-8 with BOM')
+        self.assertEqual(encoding.decode_start(codecs.BOM_UTF8 + b'abc', bom), 3)
+        self.assertEqual(encoding.decode_start(b'abc', bom), 0)
+        self.assertEqual(encoding.decode_start(codecs.BOM_UTF8 + b'abc', encoding.resolve('UTF-8')), 0)
@@ -0,0 +1,100 @@
+"""Test line ending map."""
+import unittest
+import random
+from rle.endings import EndingMap, LF, CR, CRLF
+
+
+class TestEndingMap(unittest.TestCase):
+    """Test run-length encoded ending map."""
+
+    def check(self, endings, expected):
+        """Check the map against a plain list of kinds."""
+
+        self.assertEqual(len(endings), len(expected))
+        self.assertEqual([endings.kind_at(row) for row in range(len(expected))], expected)
+        self.assertEqual([kind for row, kind in endings.iter_rows()], expected)
+        for a, b in zip(endings.kinds, endings.kinds[1:]):
+            self.assertNotEqual(a, b)
+
+    def test_uniform_is_single_run(self):
+        """Test that uniform endings take a single run."""
+
+        endings = EndingMap([(LF, 5000000), (LF, 5000000)])
+        self.assertEqual(len(endings.starts), 1)
+        self.assertEqual(len(endings), 10000000)
+        self.assertEqual(endings.uniform, LF)
+        self.assertEqual(endings.kind_at(9999999), LF)
+        self.assertIsNone(endings.kind_at(10000000))
+
+    def test_set_kind_splits_and_merges(self):
+        """Test splitting a run and merging it back."""
+
+        endings = EndingMap([(LF, 10)])
+        endings.set_kind(4, CRLF)
+        self.assertEqual(list(endings.kinds), [LF, CRLF, LF])
+        self.assertEqual(endings.count(CRLF), 1)
+        endings.set_kind(4, LF)
+        self.assertEqual(list(endings.kinds), [LF])
+        self.assertEqual(endings, EndingMap([(LF, 10)]))
+
+    def test_runs_clipped(self):
+        """Test that runs are clipped to the requested range."""
+
+        endings = EndingMap([(LF, 3), (CR, 3), (CRLF, 3)])
+        self.assertEqual(list(endings.runs(2, 7)), [(2, 1, LF), (3, 3, CR), (6, 1, CRLF)])
+        self.assertEqual(list(endings.rows(CR)), [3, 4, 5])
+
+    def test_random_set_range(self):
+        """Test random range updates against a plain list."""
+
+        rng = random.Random(0)
+        expected = [LF] * 200
+        endings = EndingMap([(LF, 200)])
+        for _ in range(500):
+            start = rng.randrange(0, 200)
+            end = rng.randrange(start, 201)
+            kind = rng.choice((LF, CR, CRLF))
+            expected[start:end] = [kind] * (end - start)
+            endings.set_range(start, end, kind)
+            self.assertEqual(endings.totals, [expected.count(k) for k in (LF, CR, CRLF)])
+        self.check(endings, expected)
+
+    def test_find_other(self):
+        """Test finding the nearest row of another kind against a plain list."""
+
+        rng = random.Random(1)
+        for _ in range(50):
+            expected = [rng.choice((LF, LF, LF, CR, CRLF)) for _ in range(rng.randrange(0, 40))]
+            endings = EndingMap((kind, 1) for kind in expected)
+            for kind in (LF, CR, CRLF):
+                for row in range(-2, len(expected) + 2):
+                    after = [r for r in range(max(row + 1, 0), len(expected)) if expected[r] != kind]
+                    before = [r for r in range(min(row, len(expected)) - 1, -1, -1) if expected[r] != kind]
+                    self.assertEqual(endings.find_other(row, kind), after[0] if after else None)
+                    self.assertEqual(endings.find_other(row, kind, False), before[0] if before else None)
+
+    def test_stats(self):
+        """Test statistics computed from the runs."""
+
+        stats = EndingMap([(LF, 10), (CRLF, 2), (LF, 5), (CR, 1), (LF, 3)]).stats()
+        self.assertEqual(stats, (18, 1, 2, LF, 2, 10, 17))
+        self.assertTrue(stats.mixed)
+        self.assertEqual(stats.to_dict()['dominant'], 'lf')
+        self.assertEqual(stats.summary(), 'mixed (LF 18, CRLF 2, CR 1), 2 runs differ from LF, rows 11-18')
+
+        stats = EndingMap([(CRLF, 7)]).stats()
+        self.assertFalse(stats.mixed)
+        self.assertEqual(stats.summary(), 'CRLF 7')
+        self.assertIsNone(EndingMap().stats().dominant)
+
+    def test_serialize(self):
+        """Test that maps survive a round trip through bytes."""
+
+        for endings in (EndingMap(), EndingMap([(LF, 10)]), EndingMap([(LF, 3), (CRLF, 70000), (CR, 1), (LF, 2)])):
+            data = endings.to_bytes()
+            self.assertEqual(len(data), 4 + len(endings.kinds) * 5)
+            self.assertEqual(EndingMap.from_bytes(data), endings)
+        with self.assertRaises(ValueError):
+            EndingMap.from_bytes(EndingMap([(LF, 3)]).to_bytes()[:-1])
+        with self.assertRaises(ValueError):
+            EndingMap.from_bytes(b'\x01\x00\x00\x00\x03\x00\x00\x00\x07')
@@ -0,0 +1,177 @@
+"""Test profiling."""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from rle.profile import ApiCounter, NullProfiler, Profiler, format_record
+from .bench import fake
+
+
+class Api(object):
+    """Class whose calls are counted."""
+
+    def call(self):
+        """Make a call."""
+
+        return 1
+
+    def _private(self):
+        """Make an uncounted call."""
+
+        return 2
+
+
+class TestProfiler(unittest.TestCase):
+    """Test the profiler."""
+
+    def setUp(self):
+        """Setup."""
+
+        self.temp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Cleanup."""
+
+        shutil.rmtree(self.temp)
+
+    def test_phases(self):
+        """Test that phases add up and API calls are only counted inside them."""
+
+        api = Api()
+        counter = ApiCounter((('api', Api),))
+        profiler = Profiler('op', counter, os.path.join(self.temp, 'profile.jsonl'))
+        call = Api.call
+        with profiler.phase('one'):
+            self.assertEqual(api.call(), 1)
+            api.call()
+            api._private()
+            with profiler.phase('two'):
+                api.call()
+        with profiler.phase('one'):
+            api.call()
+        api.call()
+        self.assertIs(Api.call, call)
+        profiler.count(lines=10, bytes=100)
+        record = profiler.finish()
+        self.assertEqual(list(record['phases']), ['two', 'one'])
+        self.assertGreaterEqual(record['total'], record['phases']['one'])
+        self.assertEqual(record['counts'], {'lines': 10, 'bytes': 100})
+        # Calls in the nested phase count towards both phases.
+        self.assertEqual(record['api_calls'], {'api.call': 5})
+
+        with open(os.path.join(self.temp, 'profile.jsonl'), encoding='utf-8') as f:
+            self.assertEqual([json.loads(line) for line in f], [json.loads(json.dumps(record))])
+        self.assertTrue(format_record(record).startswith('op '))
+
+    def test_threads(self):
+        """Test that only calls from the thread running a phase are counted towards it."""
+
+        api = Api()
+        counter = ApiCounter((('api', Api),))
+        profiler = Profiler('op', counter, os.path.join(self.temp, 'profile.jsonl'))
+        other = Profiler('other', counter, os.path.join(self.temp, 'profile.jsonl'))
+        entered = threading.Event()
+        release = threading.Event()
+
+        def work():
+            """Run a phase of the other operation while the first one is running."""
+
+            with other.phase('work'):
+                api.call()
+                entered.set()
+                release.wait()
+                api.call()
+
+        thread = threading.Thread(target=work)
+        with profiler.phase('one'):
+            thread.start()
+            entered.wait()
+            api.call()
+            release.set()
+            thread.join()
+        self.assertEqual(profiler.finish()['api_calls'], {'api.call': 1})
+        self.assertEqual(other.finish()['api_calls'], {'api.call': 2})
+        self.assertEqual(counter.saved, [])
+        self.assertEqual(counter.active, {})
+
+    def test_cprofile(self):
+        """Test that a `cProfile` capture is dumped next to the log."""
+
+        profiler = Profiler('op', log=os.path.join(self.temp, 'profile.jsonl'), cprofile=True)
+        with profiler.phase('work'):
+            sorted(range(1000), key=lambda x: -x)
+        profiler.finish()
+        self.assertEqual(len([name for name in os.listdir(self.temp) if name.endswith('.prof')]), 1)
+
+    def test_null(self):
+        """Test that the null profiler records nothing."""
+
+        profiler = NullProfiler()
+        with profiler.phase('work'):
+            profiler.count(lines=1)
+        self.assertIsNone(profiler.finish())
+
+
+class TestPluginProfile(unittest.TestCase):
+    """Test profiling the plugin's commands."""
+
+    def setUp(self):
+        """Setup."""
+
+        self.plugin = fake.load_plugin()
+        self.temp = tempfile.mkdtemp()
+        fake.CACHE_PATH = os.path.join(self.temp, 'cache')
+        self.log = os.path.join(self.temp, 'profile.jsonl')
+        settings = fake.load_settings('raw_line_edit.sublime-settings')
+        settings.set('profile', True)
+        settings.set('profile_log', self.log)
+        fake.reset()
+
+    def tearDown(self):
+        """Cleanup."""
+
+        self.plugin.VIEWS.clear()
+        self.plugin.BUSY.clear()
+        fake.SETTINGS.clear()
+        fake.reset()
+        shutil.rmtree(self.temp)
+
+    def records(self):
+        """Read the logged records."""
+
+        with open(self.log, encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def test_toggle(self):
+        """Test that toggling, inserting and saving are each logged with their phases."""
+
+        path = os.path.join(self.temp, 'file.txt')
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write(''.join('line %d%s' % (row, '\r\n' if row % 10 == 0 else '\n') for row in range(1000)))
+        window = fake.Window()
+        window.new_file()
+        view = window.open_file(path)
+
+        self.plugin.ToggleRawLineEditCommand(view).run(None)
+        fake.drain()
+        view.sel().add(fake.Region(0))
+        self.plugin.RawLineInsertCommand(view).run(None, style='Unix')
+        listener = self.plugin.RawLineEditListener()
+        listener.on_pre_save(view)
+        listener.on_post_save(view)
+
+        records = self.records()
+        self.assertEqual([r['operation'] for r in records], ['show_rle', 'insert', 'on_pre_save', 'on_post_save'])
+        show = records[0]
+        self.assertIn('scan', show['phases'])
+        self.assertIn('phantoms', show['phases'])
+        self.assertEqual(show['counts']['bytes'], os.path.getsize(path))
+        self.assertEqual(show['counts']['lines'], 1000)
+        self.assertGreater(show['api_calls']['view.run_command'], 0)
+        self.assertEqual(records[1]['counts']['selections'], 1)
+        self.assertIn('convert', records[2]['phases'])
+        self.assertIn('restore', records[3]['phases'])
+        # The API is left unwrapped.
+        self.assertEqual(self.plugin.API_CALLS.saved, [])
@@ -0,0 +1,190 @@
+"""Test line ending scanner."""
+import unittest
+import re
+import os
+import tempfile
+from rle import scan
+
+RE_NEW_LINE = re.compile(r'(?:\r\n|(?!\r\n)[\n\r])')
+
+
+def reference(text):
+    """Original regex based implementation to compare against."""
+
+    crlf = []
+    lf = []
+    cr = []
+    line = {'value': -1}
+
+    def repl(m):
+        line['value'] += 1
+        end = m.group(0)
+        if end == '\r\n':
+            crlf.append(line['value'])
+        elif end == '\n':
+            lf.append(line['value'])
+        else:
+            cr.append((line['value']))
+        return '\n'
+
+    text = RE_NEW_LINE.sub(repl, text)
+    return text, lf, cr, crlf
+
+
+class TestProcessLines(unittest.TestCase):
+    """Test `process_lines` against the original implementation."""
+
+    samples = (
+        '',
+        'no endings',
+        'a\nb\nc\n',
+        'a\r\nb\r\nc',
+        'a\rb\rc\r',
+        '\r\r\n',
+        '\n\r',
+        '\r\n\r\n\r\r\n\n',
+        'a\nb\r\nc\rd\n\re\r\n',
+        'x\n' * 20 + 'y\r\n' + 'x\n' * 20,
+        'x\r\n' * 20 + 'y\n' + 'x\r\n' * 20,
+        'x\r' * 20 + 'y\n' + 'x\r' * 20,
+        'x\r' * 20 + 'y\r\n' + 'x\r' * 20,
+        'x\r\n' * 20 + 'y\r' + 'x\r\n' * 20,
+        '\r\r\n' * 10,
+        'é ü\x0b\x0c\x1c\x85\n',
+    )
+
+    def test_matches_reference(self):
+        """Test that output matches the regex implementation exactly."""
+
+        for sample in self.samples:
+            text, lf, cr, crlf = scan.process_lines(sample)
+            ref_text, ref_lf, ref_cr, ref_crlf = reference(sample)
+            self.assertEqual(text, ref_text, repr(sample))
+            self.assertEqual(list(lf), ref_lf, repr(sample))
+            self.assertEqual(list(cr), ref_cr, repr(sample))
+            self.assertEqual(list(crlf), ref_crlf, repr(sample))
+
+    def test_array_output(self):
+        """Test that rows are returned as compact arrays."""
+
+        text, lf, cr, crlf = scan.process_lines('a\nb\r\n')
+        for rows in (lf, cr, crlf):
+            self.assertEqual(rows.typecode, 'I')
+
+
+class TestStreamScanner(unittest.TestCase):
+    """Test chunked scanning."""
+
+    def setUp(self):
+        """Setup temp directory."""
+
+        self.tempdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        """Cleanup temp directory."""
+
+        self.tempdir.cleanup()
+
+    def write(self, data):
+        """Write a temp file."""
+
+        file_name = os.path.join(self.tempdir.name, 'sample.txt')
+        with open(file_name, 'wb') as f:
+            f.write(data)
+        return file_name
+
+    def test_chunk_boundaries(self):
+        """Test that every chunk size gives the same result as scanning the whole text."""
+
+        text = 'ab\r\n\r\r\nü\n\r€\r' * 5 + 'end'
+        file_name = self.write(text.encode('utf-8'))
+        expected_text, expected = scan.scan_text(text)
+        for chunk_size in range(1, 12):
+            result_text, endings = scan.scan_file(file_name, 'utf-8', chunk_size)
+            self.assertEqual(result_text, expected_text, chunk_size)
+            self.assertEqual(endings, expected, chunk_size)
+
+    def test_known_endings(self):
+        """Test that a scanner given the ending map only normalizes the text."""
+
+        text = 'ab\r\n\r\r\nü\n\r€\r' * 5 + 'end'
+        expected_text, expected = scan.scan_text(text)
+        for chunk_size in range(1, 12):
+            scanner = scan.StreamScanner(expected)
+            data = text.encode('utf-8')
+            result = ''.join(scanner.scan_buffer(data, 'utf-8', chunk_size=chunk_size))
+            self.assertEqual(result, expected_text, chunk_size)
+            self.assertIs(scanner.endings, expected)
+
+    def test_row_offsets(self):
+        """Test that row offsets point just past every newline of the normalized text for every chunk size."""
+
+        text = 'ab\r\n\r\r\nü\n\r€\r' * 5 + 'end'
+        expected_text, endings = scan.scan_text(text)
+        expected = [m.end() for m in re.finditer('\n', expected_text)]
+        self.assertEqual(list(scan.row_offsets(expected_text)), expected)
+        for chunk_size in range(1, 12):
+            self.assertEqual(list(scan.row_offsets(expected_text, chunk_size=chunk_size)), expected, chunk_size)
+        self.assertEqual(len(expected), len(endings))
+        for known in (None, endings):
+            for chunk_size in range(1, 12):
+                scanner = scan.StreamScanner(known, offsets=True)
+                data = text.encode('utf-8')
+                ''.join(scanner.scan_buffer(data, 'utf-8', chunk_size=chunk_size))
+                self.assertEqual(list(scanner.offsets), expected, chunk_size)
+        self.assertIsNone(scan.StreamScanner().offsets)
+        # Offsets past 4 GiB characters don't overflow.
+        self.assertEqual(list(scan.row_offsets('a\nb\n', base=2 ** 32)), [2 ** 32 + 2, 2 ** 32 + 4])
+
+    def test_decode_error(self):
+        """Test that a decode error is raised."""
+
+        file_name = self.write(b'abc\n\xff\n')
+        with self.assertRaises(UnicodeDecodeError):
+            scan.scan_file(file_name, 'utf-8')
+
+
+class TestMappedScanner(unittest.TestCase):
+    """Test scanning line endings from raw bytes."""
+
+    def setUp(self):
+        """Setup temp directory."""
+
+        self.tempdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        """Cleanup temp directory."""
+
+        self.tempdir.cleanup()
+
+    def write(self, data):
+        """Write a temp file."""
+
+        file_name = os.path.join(self.tempdir.name, 'sample.txt')
+        with open(file_name, 'wb') as f:
+            f.write(data)
+        return file_name
+
+    def test_matches_text_scan(self):
+        """Test that byte scanning matches scanning the decoded text for every window size."""
+
+        for sample in TestProcessLines.samples:
+            file_name = self.write(sample.encode('utf-8'))
+            expected = scan.scan_text(sample)[1]
+            for window in (1, 2, 3, 7, scan.MAP_WINDOW):
+                self.assertEqual(scan.scan_mapped(file_name, window), expected, (sample, window))
+
+    def test_ascii_compatible(self):
+        """Test detection of encodings that can be scanned as bytes."""
+
+        for encoding in ('utf-8', 'utf_8_sig', 'latin-1', 'cp1252', 'shift_jis', 'ascii'):
+            self.assertTrue(scan.is_ascii_compatible(encoding), encoding)
+        for encoding in ('utf-16', 'utf_16_le', 'utf-32', 'cp037', 'bogus'):
+            self.assertFalse(scan.is_ascii_compatible(encoding), encoding)
+
+    def test_wide_encoding_falls_back_to_decoding(self):
+        """Test that encodings that aren't ASCII compatible are decoded."""
+
+        sample = 'a\r\nb\nc\rd'
+        file_name = self.write(sample.encode('utf-16'))
+        self.assertEqual(scan.scan_file_endings(file_name, 'utf-16'), scan.scan_text(sample)[1])
@@ -0,0 +1,83 @@
+"""Test line ending summary."""
+import unittest
+import random
+from rle.endings import LF, CR, CRLF
+from rle.scan import scan_text
+from rle import summary
+from rle.summary import anomaly_windows, skip_rows, summarize, summarize_mapped
+
+
+class TestSummary(unittest.TestCase):
+    """Test summarizing rows around line ending anomalies."""
+
+    def test_skip_rows(self):
+        """Test skipping rows against a plain split."""
+
+        rng = random.Random(7)
+        lines = ['x' * rng.randint(0, 300) for _ in range(5000)]
+        text = '\n'.join(lines)
+        offsets = [0]
+        for line in lines[:-1]:
+            offsets.append(offsets[-1] + len(line) + 1)
+        for _ in range(200):
+            row = rng.randrange(len(lines))
+            count = rng.randrange(len(lines) - row)
+            for width in (1, 80, 10000):
+                self.assertEqual(skip_rows(text, offsets[row], count, width), offsets[row + count])
+        self.assertEqual(skip_rows(text, 0, len(lines) + 10), len(text))
+
+    def test_windows(self):
+        """Test that windows around anomalies are merged and clipped."""
+
+        _, endings = scan_text('a\n' * 10 + 'b\r\n' + 'c\n' * 3 + 'd\r' + 'e\n' * 20 + 'f\r\n')
+        self.assertEqual(anomaly_windows(endings, 2), [(8, 17), (33, 37)])
+        self.assertEqual(anomaly_windows(endings, 0), [(10, 11), (14, 15), (35, 36)])
+
+    def test_summarize(self):
+        """Test the summary text, endings and original rows."""
+
+        _, endings = scan_text('')
+        self.assertEqual(summarize('', endings)[0], '')
+
+        text, endings = scan_text(''.join('line %d\n' % i for i in range(100)) + 'x\r\ny\nz')
+        summary, sparse, rows = summarize(text, endings, 1)
+        self.assertEqual(summary, '100  line 99\n101  x\n102  y\n')
+        self.assertEqual(list(sparse.iter_rows()), [(0, LF), (1, CRLF), (2, LF)])
+        self.assertEqual(list(rows), [99, 100, 101])
+
+        text, endings = scan_text('a\rb\nc\rd\re')
+        summary, sparse, rows = summarize(text, endings, 1)
+        self.assertEqual(summary, '1  a\n2  b\n3  c\n')
+        self.assertEqual(list(sparse.iter_rows()), [(0, CR), (1, LF), (2, CR)])
+
+        summary, sparse, rows = summarize(text, endings, 3)
+        self.assertEqual(summary, '1  a\n2  b\n3  c\n4  d\n5  e')
+        self.assertEqual(len(sparse), 4)
+        self.assertEqual(sparse.kind_at(3), CR)
+
+    def test_summarize_mapped(self):
+        """Test that summarizing the raw bytes matches summarizing the decoded text."""
+
+        rng = random.Random(11)
+        window = summary.SKIP_WINDOW
+        summary.SKIP_WINDOW = 64
+        try:
+            for style in ('\n', '\r\n', '\r'):
+                lines = []
+                for row in range(3000):
+                    newline = rng.choice(('\n', '\r', '\r\n')) if rng.random() < 0.01 else style
+                    lines.append('r\u00e9w %d %s%s' % (row, 'x' * rng.randint(0, 40), newline))
+                raw = ''.join(lines) + 'last'
+                text, endings = scan_text(raw)
+                data = b'\xef\xbb\xbf' + raw.encode('utf-8')
+                expected = summarize(text, endings, 2)
+                mapped = summarize_mapped(data, endings, 'utf-8', 3, 2)
+                self.assertEqual(mapped[0], expected[0])
+                self.assertEqual(list(mapped[1].iter_rows()), list(expected[1].iter_rows()))
+                self.assertEqual(list(mapped[2]), list(expected[2]))
+        finally:
+            summary.SKIP_WINDOW = window
+
+        _, endings = scan_text('a\nb\r\nc\xff\n')
+        with self.assertRaises(UnicodeDecodeError):
+            summarize_mapped(b'a\nb\r\nc\xff\n', endings, 'utf-8')